@@ -16,6 +16,8 @@ try:
 except ImportError:
     OCR_AVAILABLE = False
 
+from render_halaman import render_halaman_adaptif
+
 def ekstrak_aset_terstruktur(
     path_pdf: str, 
     progress_callback: Callable[[int, int], None] = None,
@@ -46,8 +48,7 @@ def ekstrak_aset_terstruktur(
             if not page_text.strip() and OCR_AVAILABLE:
                 metode_ekstraksi = "OCR"
                 try:
-                    pix = page.get_pixmap(dpi=200)
-                    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                    img, _ = render_halaman_adaptif(page)
                     page_text = pytesseract.image_to_string(img, lang='ind+eng')
                 except Exception:
                     metode_ekstraksi = "Gagal (Error OCR)"
@@ -0,0 +1,76 @@
+# backend/indeks_duplikat.py
+# Indeks master di memori untuk pencarian duplikat lintas sesi.
+# File master_index.json hanya dibaca sekali saat startup; setelah itu semua
+# pencarian dan penulisan dilayani dari dict di memori (lookup O(1)).
+
+import os
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Any
+
+from PIL import Image
+
+from validasi_foto import bersihkan_teks, ekstrak_metadata_dari_gambar
+from pencocokan_fuzzy import bangun_indeks_fuzzy, cari_kandidat_fuzzy
+
+INDEKS_MASTER: Dict[str, Any] = {}
+# Indeks segmen atas kunci INDEKS_MASTER, diperbarui bersamaan saat entri baru dicatat
+INDEKS_FUZZY: Dict[str, Any] = bangun_indeks_fuzzy(())
+PATH_INDEKS: Path | None = None
+KUNCI_INDEKS = threading.Lock()
+
+def muat_indeks_master(path_indeks: str | Path) -> Dict[str, Any]:
+    """
+    Memuat master_index.json ke memori. Dict yang sama dipakai ulang (clear/update)
+    agar semua modul yang sudah mengimpor INDEKS_MASTER tetap melihat data terbaru.
+    """
+    global PATH_INDEKS
+    PATH_INDEKS = Path(path_indeks)
+    data = {}
+    if PATH_INDEKS.exists():
+        with open(PATH_INDEKS, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    indeks_fuzzy_baru = bangun_indeks_fuzzy(data.keys())
+    with KUNCI_INDEKS:
+        INDEKS_MASTER.clear()
+        INDEKS_MASTER.update(data)
+        INDEKS_FUZZY.clear()
+        INDEKS_FUZZY.update(indeks_fuzzy_baru)
+    print(f"Indeks Master dimuat ke memori: {len(INDEKS_MASTER)} entri, {len(INDEKS_FUZZY['posting'])} segmen.")
+    return INDEKS_MASTER
+
+def simpan_indeks_master() -> None:
+    """Menulis isi indeks di memori ke disk secara atomik (tulis ke file sementara lalu rename)."""
+    if PATH_INDEKS is None: raise RuntimeError("Indeks Master belum dimuat.")
+    with KUNCI_INDEKS:
+        salinan = dict(INDEKS_MASTER)
+        path_sementara = PATH_INDEKS.with_suffix(PATH_INDEKS.suffix + ".tmp")
+        with open(path_sementara, "w", encoding="utf-8") as f:
+            json.dump(salinan, f, indent=4, ensure_ascii=False)
+        os.replace(path_sementara, PATH_INDEKS)
+
+def cari_berdasarkan_metadata(metadata_teks: str, ambang_jarak: int = 0) -> Dict[str, Any]:
+    """
+    Mencari entri indeks master untuk satu teks metadata (dinormalisasi seperti saat validasi).
+    Jika ambang_jarak > 0, kunci yang hanya berbeda karena salah baca OCR (jarak berbobot <= ambang_jarak)
+    ikut dikembalikan; perbedaan angka tidak pernah dianggap cocok.
+    """
+    kunci = bersihkan_teks(metadata_teks)
+    kecocokan = []
+    if kunci in INDEKS_MASTER:
+        kecocokan.append({ **INDEKS_MASTER[kunci], "metadata_cocok": kunci, "jenis_kecocokan": "exact", "jarak_edit": 0 })
+    for kunci_fuzzy, jarak in cari_kandidat_fuzzy(INDEKS_FUZZY, kunci, ambang_jarak):
+        kecocokan.append({ **INDEKS_MASTER[kunci_fuzzy], "metadata_cocok": kunci_fuzzy, "jenis_kecocokan": "fuzzy", "jarak_edit": jarak })
+    return {
+        "metadata_teks": kunci,
+        "ditemukan": bool(kecocokan),
+        "kecocokan": kecocokan
+    }
+
+def cari_batch_berdasarkan_metadata(daftar_metadata: List[str], ambang_jarak: int = 0) -> List[Dict[str, Any]]:
+    return [cari_berdasarkan_metadata(teks, ambang_jarak) for teks in daftar_metadata]
+
+def cari_berdasarkan_gambar(img: Image.Image, ambang_jarak: int = 0) -> Dict[str, Any]:
+    """Membaca overlay metadata foto dengan OCR lalu mencarinya di indeks master."""
+    return cari_berdasarkan_metadata(ekstrak_metadata_dari_gambar(img), ambang_jarak)
@@ -2,29 +2,41 @@
 from PIL import Image, ImageDraw, ImageFont
 from transformers import LayoutLMv3Processor, LayoutLMv3ForTokenClassification
 import torch
+from typing import List
 
 MODEL = None
 PROCESSOR = None
+MODEL_NAME_DEFAULT = "/app/models/layoutlmv3-finetuned-laporan-64%209-data-100e"
+MODEL_NAME_AKTIF = None
 
-def load_model():
-    global MODEL, PROCESSOR
-    if MODEL is None:
-        MODEL_NAME = "/app/models/layoutlmv3-finetuned-laporan-64%209-data-100e"
-        print(f"Memuat model AI '{MODEL_NAME}' dari folder lokal...")
-        PROCESSOR = LayoutLMv3Processor.from_pretrained(MODEL_NAME, apply_ocr=True)
-        MODEL = LayoutLMv3ForTokenClassification.from_pretrained(MODEL_NAME)
+def load_model(model_name: str = None, processor_name: str = None):
+    """
+    Memuat model (default: model produksi). Checkpoint Trainer tidak menyimpan processor,
+    jadi `processor_name` bisa diarahkan ke folder model lain yang memilikinya.
+    """
+    global MODEL, PROCESSOR, MODEL_NAME_AKTIF
+    model_name = model_name or MODEL_NAME_DEFAULT
+    if MODEL is None or MODEL_NAME_AKTIF != model_name:
+        print(f"Memuat model AI '{model_name}' dari folder lokal...")
+        PROCESSOR = LayoutLMv3Processor.from_pretrained(processor_name or model_name, apply_ocr=True)
+        MODEL = LayoutLMv3ForTokenClassification.from_pretrained(model_name)
+        MODEL.eval()
+        MODEL_NAME_AKTIF = model_name
         print("Model AI berhasil dimuat dan siap digunakan.")
 
-# Ganti fungsi ini di backend/konteks_extractor.py
-
-def analisis_halaman_dengan_layoutlmv3(image: Image.Image) -> dict:
+def analisis_batch_halaman_dengan_layoutlmv3(images: List[Image.Image], ukuran_batch: int = 8) -> List[dict]:
+    """
+    Versi batch dari analisis_halaman_dengan_layoutlmv3: semua jendela 'sliding window' dari
+    semua gambar dijalankan ke model dalam batch berukuran `ukuran_batch`, lalu token
+    dikembalikan ke gambar asalnya lewat overflow_to_sample_mapping.
+    """
     global MODEL, PROCESSOR
     if MODEL is None or PROCESSOR is None: raise RuntimeError("Model belum dimuat.")
 
     print("   - Menerapkan strategi 'Sliding Window' untuk ekstraksi komprehensif...")
-    
+
     encoding = PROCESSOR(
-        image,
+        images,
         truncation=True,
         padding="max_length",
         max_length=512,
@@ -32,53 +44,59 @@ def analisis_halaman_dengan_layoutlmv3(image: Image.Image) -> dict:
         stride=128,
         return_tensors="pt"
     )
-    
-    encoding.pop('overflow_to_sample_mapping', None)
-    
-    all_tokens = []
-    
-    # --- PERBAIKAN UTAMA ADA DI SINI ---
-    # Ekstrak tensor pixel_values dari dalam list
-    pixel_values = encoding.pixel_values[0] 
-    num_batches = len(encoding.input_ids)
-    
+
+    # Setiap jendela teks punya pixel_values milik gambar asalnya (processor menduplikasinya per jendela)
+    pemetaan_sampel = encoding.pop('overflow_to_sample_mapping').tolist()
+    pixel_values = encoding.pixel_values
+    num_windows = len(encoding.input_ids)
+    special_tokens = {PROCESSOR.tokenizer.cls_token, PROCESSOR.tokenizer.sep_token, PROCESSOR.tokenizer.pad_token}
+
+    all_tokens = [[] for _ in images]
     with torch.no_grad():
-        for i in range(num_batches):
-            # Gunakan pixel_values yang sama untuk setiap batch teks
+        for awal in range(0, num_windows, ukuran_batch):
+            akhir = min(awal + ukuran_batch, num_windows)
             batch_input = {
-                "input_ids": encoding.input_ids[i].unsqueeze(0),
-                "attention_mask": encoding.attention_mask[i].unsqueeze(0),
-                "bbox": encoding.bbox[i].unsqueeze(0),
-                "pixel_values": pixel_values.unsqueeze(0), # <-- Pastikan ada batch dimension
+                "input_ids": encoding.input_ids[awal:akhir],
+                "attention_mask": encoding.attention_mask[awal:akhir],
+                "bbox": encoding.bbox[awal:akhir],
+                "pixel_values": torch.stack([torch.as_tensor(pv) for pv in pixel_values[awal:akhir]]),
             }
-            
+
             outputs = MODEL(**batch_input)
 
-            predictions = outputs.logits.argmax(-1).squeeze().tolist()
-            token_ids = batch_input["input_ids"].squeeze().tolist()
-            boxes = batch_input["bbox"].squeeze().tolist()
-            tokens_text = PROCESSOR.tokenizer.convert_ids_to_tokens(token_ids)
+            predictions_batch = outputs.logits.argmax(-1).tolist()
+            for offset, predictions in enumerate(predictions_batch):
+                indeks_window = awal + offset
+                token_ids = batch_input["input_ids"][offset].tolist()
+                boxes = batch_input["bbox"][offset].tolist()
+                tokens_text = PROCESSOR.tokenizer.convert_ids_to_tokens(token_ids)
+
+                for token, box, pred_id in zip(tokens_text, boxes, predictions):
+                    if token in special_tokens:
+                        continue
+                    all_tokens[pemetaan_sampel[indeks_window]].append({
+                        "token": token,
+                        "label": MODEL.config.id2label[pred_id],
+                        "box": [int(coord) for coord in box]
+                    })
 
-            for token, box, pred_id in zip(tokens_text, boxes, predictions):
-                if token in [PROCESSOR.tokenizer.cls_token, PROCESSOR.tokenizer.sep_token, PROCESSOR.tokenizer.pad_token]:
-                    continue
-                all_tokens.append({
-                    "token": token,
-                    "label": MODEL.config.id2label[pred_id],
-                    "box": [int(coord) for coord in box]
-                })
+    hasil = []
+    for tokens_gambar in all_tokens:
+        # Hapus duplikat yang mungkin muncul di area tumpang tindih
+        unique_tokens = []
+        seen_tokens = set()
+        for token in tokens_gambar:
+            token_id = (token['token'], tuple(token['box']))
+            if token_id not in seen_tokens:
+                unique_tokens.append(token)
+                seen_tokens.add(token_id)
+        hasil.append({"hasil_analisis_kontekstual": unique_tokens})
 
-    # Hapus duplikat yang mungkin muncul di area tumpang tindih
-    unique_tokens = []
-    seen_tokens = set()
-    for token in all_tokens:
-        token_id = (token['token'], tuple(token['box']))
-        if token_id not in seen_tokens:
-            unique_tokens.append(token)
-            seen_tokens.add(token_id)
-    
-    print(f"   - Ekstraksi selesai, total {len(unique_tokens)} token unik berhasil diekstrak.")
-    return {"hasil_analisis_kontekstual": unique_tokens}
+    print(f"   - Ekstraksi selesai, total {sum(len(h['hasil_analisis_kontekstual']) for h in hasil)} token unik dari {len(images)} gambar.")
+    return hasil
+
+def analisis_halaman_dengan_layoutlmv3(image: Image.Image) -> dict:
+    return analisis_batch_halaman_dengan_layoutlmv3([image])[0]
 
 # Fungsi visualisasi tidak diubah
 def visualisasikan_hasil_analisis(image: Image.Image, hasil_analisis: dict) -> Image.Image:
@@ -0,0 +1,119 @@
+# backend/laporan_sesi.py
+# Laporan sesi yang ditulis bertahap ke SQLite (satu file per sesi). Setiap proyek yang selesai
+# dicatat dalam satu transaksi bersama penghitung ringkasan, sehingga laporan parsial tetap
+# tersedia jika batch berhenti di tengah jalan, dan detail duplikat bisa dibaca per halaman.
+
+import json
+import sqlite3
+from pathlib import Path
+from datetime import datetime
+from contextlib import closing
+from typing import Dict, Any
+
+NAMA_FILE_DB = "laporan_sesi.sqlite"
+MAKS_PER_HALAMAN = 500
+
+SKEMA = """
+CREATE TABLE IF NOT EXISTS ringkasan (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    id_sesi TEXT, status TEXT, waktu_mulai TEXT, waktu_selesai TEXT,
+    total_proyek INTEGER DEFAULT 0, total_proyek_gagal INTEGER DEFAULT 0,
+    total_gambar_diproses INTEGER DEFAULT 0, total_duplikat_ditemukan INTEGER DEFAULT 0,
+    total_file_unik_baru INTEGER DEFAULT 0, total_error INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS proyek (
+    id INTEGER PRIMARY KEY, nama_file TEXT, sha256 TEXT, status TEXT, status_kelengkapan TEXT,
+    jumlah_gambar INTEGER, jumlah_duplikat INTEGER, file_unik_baru INTEGER, pesan TEXT, waktu TEXT
+);
+CREATE TABLE IF NOT EXISTS duplikat (
+    id INTEGER PRIMARY KEY, proyek TEXT, path TEXT, sesi_sumber TEXT, proyek_sumber TEXT, path_sumber TEXT,
+    jenis_kecocokan TEXT, jarak_edit INTEGER, metadata_teks TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_duplikat_proyek ON duplikat (proyek);
+CREATE INDEX IF NOT EXISTS idx_duplikat_sesi_sumber ON duplikat (sesi_sumber);
+CREATE TABLE IF NOT EXISTS error_log (id INTEGER PRIMARY KEY, proyek TEXT, pesan TEXT);
+CREATE INDEX IF NOT EXISTS idx_error_proyek ON error_log (proyek);
+"""
+
+def path_db_sesi(path_sesi: str | Path) -> Path:
+    return Path(path_sesi) / NAMA_FILE_DB
+
+def _koneksi(path_sesi: str | Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path_db_sesi(path_sesi))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def buat_laporan_sesi(path_sesi: str | Path, id_sesi: str) -> None:
+    Path(path_sesi).mkdir(parents=True, exist_ok=True)
+    with closing(_koneksi(path_sesi)) as conn, conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SKEMA)
+        conn.execute("INSERT OR IGNORE INTO ringkasan (id, id_sesi, status, waktu_mulai) VALUES (1, ?, 'berjalan', ?)", (id_sesi, datetime.now().isoformat(timespec="seconds")))
+
+def catat_file_ditolak(path_sesi: str | Path, nama_file: str, alasan: str) -> None:
+    with closing(_koneksi(path_sesi)) as conn, conn:
+        conn.execute("INSERT INTO proyek (nama_file, status, pesan, waktu) VALUES (?, 'ditolak', ?, ?)", (nama_file, alasan, datetime.now().isoformat(timespec="seconds")))
+
+def catat_proyek_selesai(path_sesi: str | Path, nama_file: str, sha256: str, status_kelengkapan: str, hasil_validasi_foto: Dict[str, Any]) -> None:
+    detail_duplikat = hasil_validasi_foto.get("detail_duplikat", [])
+    error_log = hasil_validasi_foto.get("error_log", [])
+    with closing(_koneksi(path_sesi)) as conn, conn:
+        conn.execute(
+            "INSERT INTO proyek (nama_file, sha256, status, status_kelengkapan, jumlah_gambar, jumlah_duplikat, file_unik_baru, waktu) VALUES (?, ?, 'selesai', ?, ?, ?, ?, ?)",
+            (nama_file, sha256, status_kelengkapan, hasil_validasi_foto.get("jumlah_gambar_diproses", 0), len(detail_duplikat), hasil_validasi_foto.get("file_unik_baru_dicatat", 0), datetime.now().isoformat(timespec="seconds"))
+        )
+        conn.executemany(
+            "INSERT INTO duplikat (proyek, path, sesi_sumber, proyek_sumber, path_sumber, jenis_kecocokan, jarak_edit, metadata_teks) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(nama_file, d["duplikat_ditemukan"], d["duplikat_dari_petunjuk"].get("sesi_asli"), d["duplikat_dari_petunjuk"].get("proyek_asli"), d["duplikat_dari_petunjuk"].get("path_relatif_di_sesi"), d.get("jenis_kecocokan"), d.get("jarak_edit"), d.get("metadata_teks")) for d in detail_duplikat]
+        )
+        conn.executemany("INSERT INTO error_log (proyek, pesan) VALUES (?, ?)", [(nama_file, pesan) for pesan in error_log])
+        conn.execute(
+            "UPDATE ringkasan SET total_proyek = total_proyek + 1, total_gambar_diproses = total_gambar_diproses + ?, total_duplikat_ditemukan = total_duplikat_ditemukan + ?, total_file_unik_baru = total_file_unik_baru + ?, total_error = total_error + ? WHERE id = 1",
+            (hasil_validasi_foto.get("jumlah_gambar_diproses", 0), len(detail_duplikat), hasil_validasi_foto.get("file_unik_baru_dicatat", 0), len(error_log))
+        )
+
+def catat_proyek_gagal(path_sesi: str | Path, nama_file: str, sha256: str, pesan: str) -> None:
+    with closing(_koneksi(path_sesi)) as conn, conn:
+        conn.execute("INSERT INTO proyek (nama_file, sha256, status, pesan, waktu) VALUES (?, ?, 'gagal', ?, ?)", (nama_file, sha256, pesan, datetime.now().isoformat(timespec="seconds")))
+        conn.execute("INSERT INTO error_log (proyek, pesan) VALUES (?, ?)", (nama_file, pesan))
+        conn.execute("UPDATE ringkasan SET total_proyek_gagal = total_proyek_gagal + 1, total_error = total_error + 1 WHERE id = 1")
+
+def tandai_sesi_selesai(path_sesi: str | Path) -> None:
+    with closing(_koneksi(path_sesi)) as conn, conn:
+        conn.execute("UPDATE ringkasan SET status = 'selesai', waktu_selesai = ? WHERE id = 1 AND status = 'berjalan'", (datetime.now().isoformat(timespec="seconds"),))
+
+def baca_ringkasan(path_sesi: str | Path) -> Dict[str, Any]:
+    with closing(_koneksi(path_sesi)) as conn:
+        ringkasan = dict(conn.execute("SELECT * FROM ringkasan WHERE id = 1").fetchone())
+        ringkasan.pop("id")
+        ringkasan["proyek_yang_diproses"] = [dict(r) for r in conn.execute("SELECT nama_file, sha256, status_kelengkapan FROM proyek WHERE status = 'selesai' ORDER BY id")]
+        ringkasan["file_ditolak"] = [{"nama_file": r["nama_file"], "alasan": r["pesan"]} for r in conn.execute("SELECT nama_file, pesan FROM proyek WHERE status = 'ditolak' ORDER BY id")]
+    return ringkasan
+
+def _baca_halaman(path_sesi: str | Path, tabel: str, filter_kolom: Dict[str, Any], halaman: int, per_halaman: int) -> Dict[str, Any]:
+    per_halaman = max(1, min(per_halaman, MAKS_PER_HALAMAN))
+    halaman = max(1, halaman)
+    # Nama kolom berasal dari kode (bukan input pengguna); nilainya selalu lewat parameter
+    kondisi = [(kolom, nilai) for kolom, nilai in filter_kolom.items() if nilai is not None]
+    where = (" WHERE " + " AND ".join(f"{kolom} = ?" for kolom, _ in kondisi)) if kondisi else ""
+    parameter = [nilai for _, nilai in kondisi]
+    with closing(_koneksi(path_sesi)) as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM {tabel}{where}", parameter).fetchone()[0]
+        baris = conn.execute(f"SELECT * FROM {tabel}{where} ORDER BY id LIMIT ? OFFSET ?", parameter + [per_halaman, (halaman - 1) * per_halaman]).fetchall()
+    return {"total": total, "halaman": halaman, "per_halaman": per_halaman, "data": [dict(r) for r in baris]}
+
+def baca_proyek(path_sesi: str | Path, status: str = None, halaman: int = 1, per_halaman: int = 50) -> Dict[str, Any]:
+    return _baca_halaman(path_sesi, "proyek", {"status": status}, halaman, per_halaman)
+
+def baca_duplikat(path_sesi: str | Path, proyek: str = None, sesi_sumber: str = None, jenis_kecocokan: str = None, halaman: int = 1, per_halaman: int = 50) -> Dict[str, Any]:
+    return _baca_halaman(path_sesi, "duplikat", {"proyek": proyek, "sesi_sumber": sesi_sumber, "jenis_kecocokan": jenis_kecocokan}, halaman, per_halaman)
+
+def baca_error(path_sesi: str | Path, proyek: str = None, halaman: int = 1, per_halaman: int = 50) -> Dict[str, Any]:
+    return _baca_halaman(path_sesi, "error_log", {"proyek": proyek}, halaman, per_halaman)
+
+def tulis_ringkasan_json(path_sesi: str | Path) -> Path:
+    """Salinan ringkasan (tanpa detail) dalam laporan_sesi_keseluruhan.json untuk kompatibilitas."""
+    path_laporan = Path(path_sesi) / "laporan_sesi_keseluruhan.json"
+    with open(path_laporan, "w", encoding="utf-8") as f:
+        json.dump(baca_ringkasan(path_sesi), f, indent=4, ensure_ascii=False)
+    return path_laporan
@@ -1,25 +1,37 @@
 # backend/main.py
 import os
+import io
 import shutil
 import json
-import glob
 import sys
 import uuid
+import asyncio
+import threading
+import mimetypes
 import fitz
 from pathlib import Path
 from datetime import datetime
 from typing import List
 from PIL import Image
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Body, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from fastapi.concurrency import run_in_threadpool
 
 # --- PERBAIKAN DI SINI ---
 # Hapus titik (.) dari semua impor lokal
 from ekstraksi_pdf import ekstrak_aset_terstruktur, simpan_hasil_ke_disk
 from validasi_foto import proses_validasi_dengan_petunjuk
+from render_halaman import render_halaman_adaptif
 from konteks_extractor import load_model, analisis_halaman_dengan_layoutlmv3, visualisasikan_hasil_analisis
 from validasi_konten import cek_kelengkapan_dokumen
+from penyimpanan_analisis import simpan_laporan_kontekstual_kompak
+from unggahan import simpan_unggahan_bertahap, nama_file_aman, UnggahanDitolak, BATAS_UKURAN_SESI
+from revalidasi import muat_aturan_kelengkapan, daftar_versi_aturan, revalidasi_sesi, POLA_ID_SESI
+from progres import buat_kanal_progres, kanal_ada, laporkan_progres, laporkan_status, tandai_selesai, stream_progres
+from laporan_sesi import buat_laporan_sesi, catat_file_ditolak, catat_proyek_selesai, catat_proyek_gagal, tandai_sesi_selesai, baca_ringkasan, baca_proyek, baca_duplikat, baca_error, tulis_ringkasan_json, path_db_sesi
+from siklus_penyimpanan import muat_konfigurasi_retensi, kumpulkan_referensi, jalankan_pemadatan, baca_berkas_sesi
+from indeks_duplikat import INDEKS_MASTER, INDEKS_FUZZY, muat_indeks_master, simpan_indeks_master, cari_berdasarkan_metadata, cari_batch_berdasarkan_metadata, cari_berdasarkan_gambar
 # --------------------------
 
 # Muat model AI saat startup
@@ -57,39 +69,83 @@ SISTEM_VALIDASI_DIR.mkdir(parents=True, exist_ok=True)
 
 EKSTENSI_GAMBAR = ["jpg", "jpeg", "png", "bmp"]
 
-# aturan kelengkapan dokumen
-ATURAN_KELENGKAPAN = {
-    "frasa_wajib": [
-        "DOKUMEN BERITA ACARA UJI TERIMA KESATU",
-        "CHECKLIST VERIFIKASI BA UJI TERIMA",
-        "BERITA ACARA",
-        "LAPORAN",
-        "DAFTAR HADIR UJI TERIMA",
-        "BOQ UJI TERIMA",
-        "DOKUMENTASI UJI TERIMA",
-        "FORM PENGUKURAN OPM",
-        "PENGUKURAN OPM",
-        "PENGUKURAN OTDR",
-        "REPORT OTDR",
-        "DOKUMENTASI PEKERJAAN",
-        "AS BUILT DRAWING",
-        "LAMPIRAN MANCORE",
-        "LAMPIRAN KML"
-    ]
-}
+# Jarak edit berbobot maksimum agar dua teks metadata foto dianggap sama (salah baca OCR seperti 0/O, -/.).
+# Perbedaan angka (mis. detik pada timestamp) tidak pernah dianggap cocok, lihat pencocokan_fuzzy.py.
+# Set ke 0 untuk menonaktifkan pencocokan fuzzy.
+AMBANG_JARAK_FUZZY = 2
+MAKS_TEKS_BATCH = 500
+
+# Hasil analisis token disimpan dalam format kompak (.npz). Aktifkan untuk ikut menulis
+# laporan_kontekstual.json (berukuran besar) saat debugging.
+SIMPAN_LAPORAN_KONTEKSTUAL_JSON = False
+
+# aturan kelengkapan dokumen dibaca dari file berversi di aturan_kelengkapan/<versi>.json
+VERSI_ATURAN_KELENGKAPAN = "v1"
+# Batas proses worker revalidasi lewat API agar tidak berebut CPU dengan pemrosesan sesi
+MAKS_WORKER_REVALIDASI = min(4, os.cpu_count() or 1)
+ATURAN_KELENGKAPAN = muat_aturan_kelengkapan(VERSI_ATURAN_KELENGKAPAN)
 
 def buat_id_sesi():
     return datetime.now().strftime("%Y%m%d-%H%M%S") + "_" + str(uuid.uuid4())[:8]
 
-def progress_reporter(tahap: str, current: int, total: int):
+# Pemrosesan sesi berjalan di threadpool agar event loop tetap bisa melayani stream progres,
+# tetapi tetap satu sesi pada satu waktu (model & tokenizer dipakai bersama)
+KUNCI_PEMROSESAN = threading.Lock()
+TUGAS_PEMADATAN = None
+
+def progress_reporter(tahap: str, current: int, total: int, id_sesi: str = None, proyek: str = None):
     sys.stdout.write(f"\r[{tahap}] Memproses... {current}/{total}   ")
     sys.stdout.flush()
     if current == total:
         print()
+    if id_sesi:
+        laporkan_progres(id_sesi, tahap, proyek, current, total)
 
-@app.post("/upload_and_validate", tags=["Proses Utama"])
-async def upload_and_validate_multiple_pdfs(files: List[UploadFile] = File(...)):
+@app.on_event("startup")
+def muat_indeks_master_saat_startup():
+    muat_indeks_master(PATH_MASTER_INDEX)
+
+def padatkan_output_ekstraksi() -> dict:
+    # Salinan dict (seperti simpan_indeks_master) agar aman terhadap penulisan Tahap 4 yang berjalan bersamaan
+    referensi = kumpulkan_referensi(dict(INDEKS_MASTER))
+    hasil = jalankan_pemadatan(OUTPUT_EKSTRAKSI_DIR, referensi, muat_konfigurasi_retensi())
+    if hasil["file_dikemas"] or hasil["file_dipangkas"] or hasil["error_log"]:
+        print(f"[Pemadatan] {hasil['file_dikemas']} file dikemas, {hasil['file_dipangkas']} file dipangkas, {len(hasil['error_log'])} error.")
+    return hasil
+
+async def pemadatan_berkala():
+    while True:
+        try:
+            await run_in_threadpool(padatkan_output_ekstraksi)
+        except Exception as e:
+            print(f"[Pemadatan] Gagal: {e}")
+        await asyncio.sleep(muat_konfigurasi_retensi()["interval_pemadatan_menit"] * 60)
+
+@app.on_event("startup")
+async def mulai_pemadatan_berkala():
+    # Interval 0 menonaktifkan job latar; pemadatan tetap bisa dijalankan lewat CLI siklus_penyimpanan.py
+    global TUGAS_PEMADATAN
+    if muat_konfigurasi_retensi()["interval_pemadatan_menit"] > 0:
+        TUGAS_PEMADATAN = asyncio.create_task(pemadatan_berkala())
+
+@app.post("/sesi", tags=["Proses Utama"])
+async def buat_sesi_baru():
+    # Frontend membuat sesi lebih dulu agar bisa membuka stream progres sebelum mengunggah
     id_sesi = buat_id_sesi()
+    buat_kanal_progres(id_sesi)
+    return {"id_sesi": id_sesi}
+
+@app.get("/progres/{id_sesi}", tags=["Proses Utama"])
+async def stream_progres_sesi(id_sesi: str):
+    return StreamingResponse(stream_progres(id_sesi), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/upload_and_validate", tags=["Proses Utama"])
+async def upload_and_validate_multiple_pdfs(files: List[UploadFile] = File(...), id_sesi: str | None = None):
+    if id_sesi is None:
+        id_sesi = buat_id_sesi()
+        buat_kanal_progres(id_sesi)
+    elif not POLA_ID_SESI.match(id_sesi) or not kanal_ada(id_sesi) or (OUTPUT_EKSTRAKSI_DIR / id_sesi).exists():
+        raise HTTPException(status_code=400, detail="ID sesi tidak valid atau sudah dipakai.")
     path_sesi_output = OUTPUT_EKSTRAKSI_DIR / id_sesi
     
     print("\n" + "="*50)
@@ -97,30 +153,80 @@ async def upload_and_validate_multiple_pdfs(files: List[UploadFile] = File(...))
     print(f"Menerima {len(files)} file untuk diproses.")
     print("="*50)
 
-    laporan_sesi_keseluruhan = { "id_sesi": id_sesi, "proyek_yang_diproses": [], "hasil_validasi_kelengkapan": [], "total_gambar_diproses": 0, "total_duplikat_ditemukan": 0, "total_file_unik_baru": 0, "semua_detail_duplikat": [], "semua_error_log": [] }
-    
-    indeks_master = {}
-    if PATH_MASTER_INDEX.exists():
-        with open(PATH_MASTER_INDEX, "r", encoding="utf-8") as f:
-            indeks_master = json.load(f)
-
-    for idx, file in enumerate(files, 1):
-        nama_proyek_folder = Path(file.filename).stem
-        path_proyek_output = path_sesi_output / nama_proyek_folder
-        print(f"\n--- Memproses Proyek {idx}/{len(files)}: {file.filename} ---")
-        
-        temp_pdf_path = INPUT_PDF_DIR / file.filename
+    laporkan_status(id_sesi, "menerima", message="Menerima file unggahan...")
+    path_input_sesi = INPUT_PDF_DIR / id_sesi
+    # Sampai sesi diserahkan ke proses_sesi, kegagalan apa pun (I/O, PyMuPDF, koneksi terputus) harus
+    # tetap menutup stream progres dan laporan sesi agar tidak menggantung sebagai 'berjalan'
+    diserahkan, status_gagal = False, "gagal"
+    try:
+        # Laporan sesi ditulis bertahap ke SQLite; detailnya dibaca lewat endpoint /sesi/{id_sesi}/...
+        buat_laporan_sesi(path_sesi_output, id_sesi)
+        file_ditolak = []
+
+        # Tahap 0: terima semua file per chunk ke folder unik sesi, hash, dan validasi PDF
+        # sebelum tahap mahal mana pun dimulai
+        path_input_sesi.mkdir(parents=True, exist_ok=True)
+        unggahan_diterima, sisa_kuota_sesi = [], BATAS_UKURAN_SESI
+        for idx, file in enumerate(files, 1):
+            # Prefiks indeks membuat nama unik dalam sesi; dipakai juga untuk folder proyek agar
+            # nama file yang sama tidak saling menimpa
+            nama_unik = f"{idx:03d}_{nama_file_aman(file.filename)}"
+            try:
+                info_unggahan = await simpan_unggahan_bertahap(file, path_input_sesi / nama_unik, sisa_kuota_sesi)
+            except UnggahanDitolak as e:
+                print(f"[DITOLAK] {file.filename}: {e}")
+                file_ditolak.append({"nama_file": file.filename, "alasan": str(e)})
+                catat_file_ditolak(path_sesi_output, file.filename, str(e))
+                continue
+            sisa_kuota_sesi -= info_unggahan["ukuran_byte"]
+            unggahan_diterima.append({ "nama_file": file.filename, "nama_proyek_folder": Path(nama_unik).stem, **info_unggahan })
+
+        if not unggahan_diterima:
+            status_gagal = "ditolak"
+            raise HTTPException(status_code=400, detail={"message": "Tidak ada file PDF valid yang diterima.", "file_ditolak": file_ditolak})
+
+        laporkan_status(id_sesi, "antrean", message="Menunggu giliran pemrosesan...")
+        diserahkan = True
+    finally:
+        if not diserahkan:
+            shutil.rmtree(path_input_sesi, ignore_errors=True)
+            if path_db_sesi(path_sesi_output).exists():
+                tandai_sesi_selesai(path_sesi_output)
+            tandai_selesai(id_sesi, status=status_gagal)
+
+    return await run_in_threadpool(proses_sesi, id_sesi, unggahan_diterima, path_input_sesi)
+
+def proses_sesi(id_sesi: str, unggahan_diterima: List[dict], path_input_sesi: Path) -> JSONResponse:
+    path_sesi_output = OUTPUT_EKSTRAKSI_DIR / id_sesi
+    try:
+        with KUNCI_PEMROSESAN:
+            return _proses_sesi(id_sesi, unggahan_diterima, path_input_sesi)
+    finally:
+        # Juga menutup laporan jika _proses_sesi gagal di luar loop per proyek (no-op jika sudah selesai)
+        tandai_sesi_selesai(path_sesi_output)
+        ringkasan = baca_ringkasan(path_sesi_output)
+        tandai_selesai(id_sesi, total_proyek=len(ringkasan["proyek_yang_diproses"]), total_duplikat=ringkasan["total_duplikat_ditemukan"])
+
+def _proses_sesi(id_sesi: str, unggahan_diterima: List[dict], path_input_sesi: Path) -> JSONResponse:
+    path_sesi_output = OUTPUT_EKSTRAKSI_DIR / id_sesi
+
+    # Indeks master dilayani dari memori; penulisan di Tahap 4 langsung terlihat oleh API pencarian
+    indeks_master = INDEKS_MASTER
+
+    for idx, unggahan in enumerate(unggahan_diterima, 1):
+        nama_file = unggahan["nama_file"]
+        path_proyek_output = path_sesi_output / unggahan["nama_proyek_folder"]
+        print(f"\n--- Memproses Proyek {idx}/{len(unggahan_diterima)}: {nama_file} ({unggahan['jumlah_halaman']} halaman, sha256 {unggahan['sha256'][:12]}) ---")
+
+        temp_pdf_path = unggahan["path"]
         doc = None
         try:
-            with open(temp_pdf_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-
-            laporan_proyek_final = {}
+            laporan_proyek_final = {"nama_file": nama_file, "sha256": unggahan["sha256"], "ukuran_byte": unggahan["ukuran_byte"]}
 
             #tahap 1: ekstraksi aset dasar
             print("[Tahap 1/4] Memulai ekstraksi aset dasar...")
             def ekstraksi_progress_reporter(current, total):
-                progress_reporter("Tahap 1/4 - Ekstraksi Dasar", current, total)
+                progress_reporter("Tahap 1/4 - Ekstraksi Dasar", current, total, id_sesi, nama_file)
             
             data_mentah = ekstrak_aset_terstruktur(str(temp_pdf_path), progress_callback=ekstraksi_progress_reporter)
             if not data_mentah: raise Exception("Ekstraksi dasar gagal.")
@@ -133,13 +239,12 @@ async def upload_and_validate_multiple_pdfs(files: List[UploadFile] = File(...))
             hasil_kontekstual_proyek = []
             total_halaman = len(doc)
             for page_num in range(total_halaman):
-                progress_reporter("Tahap 2/4 - Analisis AI", page_num + 1, total_halaman)
+                progress_reporter("Tahap 2/4 - Analisis AI", page_num + 1, total_halaman, id_sesi, nama_file)
                 page = doc.load_page(page_num)
-                pix = page.get_pixmap(dpi=200)
-                image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                image, info_render = render_halaman_adaptif(page)
 
                 hasil_analisis_halaman = analisis_halaman_dengan_layoutlmv3(image)
-                hasil_kontekstual_proyek.append({ "halaman": page_num + 1, "analisis": hasil_analisis_halaman })
+                hasil_kontekstual_proyek.append({ "halaman": page_num + 1, "analisis": hasil_analisis_halaman, "dpi_render": info_render["dpi"] })
 
                 gambar_visualisasi = visualisasikan_hasil_analisis(image, hasil_analisis_halaman)
                 folder_halaman_output = path_proyek_output / f"halaman_{page_num + 1}"
@@ -148,41 +253,44 @@ async def upload_and_validate_multiple_pdfs(files: List[UploadFile] = File(...))
                 path_output_debug = folder_halaman_output / nama_file_debug
                 gambar_visualisasi.save(path_output_debug)
 
-            path_laporan_kontekstual = path_proyek_output / "laporan_kontekstual.json"
-            with open(path_laporan_kontekstual, "w", encoding="utf-8") as f: json.dump(hasil_kontekstual_proyek, f, indent=4, ensure_ascii=False)
+            simpan_laporan_kontekstual_kompak(hasil_kontekstual_proyek, str(path_proyek_output / "laporan_kontekstual.npz"))
+            if SIMPAN_LAPORAN_KONTEKSTUAL_JSON:
+                path_laporan_kontekstual = path_proyek_output / "laporan_kontekstual.json"
+                with open(path_laporan_kontekstual, "w", encoding="utf-8") as f: json.dump(hasil_kontekstual_proyek, f, indent=4, ensure_ascii=False)
             print(f"[Tahap 2/4] Analisis kontekstual selesai. Visualisasi disimpan")
 
             # Tahap baru validasi kelengkapan dokumen
             print("[Tahap 3/4] Memulai validasi kelengkapan dokumen...")
+            progress_reporter("Tahap 3/4 - Validasi Kelengkapan", 0, 1, id_sesi, nama_file)
             hasil_validasi_kelengkapan = cek_kelengkapan_dokumen(hasil_kontekstual_proyek, ATURAN_KELENGKAPAN)
+            progress_reporter("Tahap 3/4 - Validasi Kelengkapan", 1, 1, id_sesi, nama_file)
             laporan_proyek_final["validasi_kelengkapan"] = hasil_validasi_kelengkapan
             print(f"[Tahap 3/4] Validasi kelengkapan selesai. Status: {hasil_validasi_kelengkapan['status']}")
 
             # Tahap 4: validasi dupplikasi foto
             print("[Tahap 4/4] Memulai validasi duplikasi foto...")
-            list_gambar_absolut = []
-            for ext in EKSTENSI_GAMBAR: list_gambar_absolut.extend(glob.glob(str(path_proyek_output / '**' / f'*.{ext}'), recursive=True))
+            # Daftar gambar diambil dari hasil Tahap 1 (path relatif terhadap folder sesi), bukan pindai direktori
+            # rekursif; visualisasi debug Tahap 2 dengan sendirinya tidak ikut divalidasi
+            list_gambar_absolut = [str(path_sesi_output / gambar["path"]) for halaman in hasil_ekstraksi["hasil_per_halaman"] for gambar in halaman["path_gambar"] if gambar["format"].lower() in EKSTENSI_GAMBAR]
             print(f"Ditemukan {len(list_gambar_absolut)} gambar untuk divalidasi.")
             
             def validasi_progress_reporter(current, total):
-                progress_reporter("Tahap 4/4 - Validasi Foto", current, total)
+                progress_reporter("Tahap 4/4 - Validasi Foto", current, total, id_sesi, nama_file)
 
-            hasil_validasi_foto = proses_validasi_dengan_petunjuk( list_gambar_proyek=list_gambar_absolut, indeks_master=indeks_master, nama_proyek=file.filename, path_sesi=str(path_sesi_output), progress_callback=validasi_progress_reporter)
+            hasil_validasi_foto = proses_validasi_dengan_petunjuk( list_gambar_proyek=list_gambar_absolut, indeks_master=indeks_master, nama_proyek=nama_file, path_sesi=str(path_sesi_output), progress_callback=validasi_progress_reporter, indeks_fuzzy=INDEKS_FUZZY, ambang_jarak_fuzzy=AMBANG_JARAK_FUZZY)
             laporan_proyek_final["validasi_duplikasi_foto"] = hasil_validasi_foto
             print(f"[Tahap 4/4] Validasi selesai. Duplikat: {hasil_validasi_foto.get('duplikat_ditemukan', 0)}")
             
             path_laporan_proyek = path_proyek_output / "laporan_validasi_proyek.json"
             with open(path_laporan_proyek, "w", encoding="utf-8") as f: json.dump(laporan_proyek_final, f, indent=4, ensure_ascii=False)
             
-            laporan_sesi_keseluruhan["proyek_yang_diproses"].append({"nama_file": file.filename, "status_kelengkapan": hasil_validasi_kelengkapan['status']})
-            laporan_sesi_keseluruhan["total_gambar_diproses"] += hasil_validasi_foto["jumlah_gambar_diproses"]
-            laporan_sesi_keseluruhan["total_duplikat_ditemukan"] += hasil_validasi_foto["duplikat_ditemukan"]
-            laporan_sesi_keseluruhan["total_file_unik_baru"] += hasil_validasi_foto["file_unik_baru_dicatat"]
-            laporan_sesi_keseluruhan["semua_detail_duplikat"].extend(hasil_validasi_foto["detail_duplikat"])
-            laporan_sesi_keseluruhan["semua_error_log"].extend(hasil_validasi_foto["error_log"])
+            # Satu transaksi per proyek: detail duplikat tidak menumpuk di memori dan laporan
+            # parsial tetap utuh jika proyek berikutnya gagal
+            catat_proyek_selesai(path_sesi_output, nama_file, unggahan["sha256"], hasil_validasi_kelengkapan['status'], hasil_validasi_foto)
 
         except Exception as e:
-            print(f"\n[ERROR] Gagal memproses {file.filename}: {e}")
+            print(f"\n[ERROR] Gagal memproses {nama_file}: {e}")
+            catat_proyek_gagal(path_sesi_output, nama_file, unggahan["sha256"], str(e))
             continue
         finally:
             if doc:
@@ -190,20 +298,88 @@ async def upload_and_validate_multiple_pdfs(files: List[UploadFile] = File(...))
             if temp_pdf_path.exists():
                 os.remove(temp_pdf_path)
 
-    path_laporan_sesi = path_sesi_output / "laporan_sesi_keseluruhan.json"
-    with open(path_laporan_sesi, "w", encoding="utf-8") as f:
-        json.dump(laporan_sesi_keseluruhan, f, indent=4, ensure_ascii=False)
+    shutil.rmtree(path_input_sesi, ignore_errors=True)
+
+    tandai_sesi_selesai(path_sesi_output)
+    path_laporan_sesi = tulis_ringkasan_json(path_sesi_output)
     print(f"\nLaporan ringkasan sesi disimpan di: {path_laporan_sesi}")
     
-    with open(PATH_MASTER_INDEX, "w", encoding="utf-8") as f:
-        json.dump(indeks_master, f, indent=4, ensure_ascii=False)
+    simpan_indeks_master()
     print("Indeks Master berhasil diperbarui.")
     
     print("="*50)
     print("Sesi keseluruhan selesai.")
     print("="*50 + "\n")
 
-    return JSONResponse(status_code=200, content=laporan_sesi_keseluruhan)
+    # Respons hanya berisi ringkasan; detail duplikat/error diambil per halaman
+    return JSONResponse(status_code=200, content=baca_ringkasan(path_sesi_output))
+
+def path_laporan_sesi_tersimpan(id_sesi: str) -> Path:
+    path_sesi_output = OUTPUT_EKSTRAKSI_DIR / id_sesi
+    if not POLA_ID_SESI.match(id_sesi) or not path_db_sesi(path_sesi_output).exists():
+        raise HTTPException(status_code=404, detail="Laporan sesi tidak ditemukan.")
+    return path_sesi_output
+
+@app.get("/sesi/{id_sesi}/ringkasan", tags=["Laporan Sesi"])
+def lihat_ringkasan_sesi(id_sesi: str):
+    return baca_ringkasan(path_laporan_sesi_tersimpan(id_sesi))
+
+@app.get("/sesi/{id_sesi}/proyek", tags=["Laporan Sesi"])
+def lihat_proyek_sesi(id_sesi: str, status: str | None = None, halaman: int = 1, per_halaman: int = 50):
+    return baca_proyek(path_laporan_sesi_tersimpan(id_sesi), status, halaman, per_halaman)
+
+@app.get("/sesi/{id_sesi}/duplikat", tags=["Laporan Sesi"])
+def lihat_duplikat_sesi(id_sesi: str, proyek: str | None = None, sesi_sumber: str | None = None, jenis_kecocokan: str | None = None, halaman: int = 1, per_halaman: int = 50):
+    return baca_duplikat(path_laporan_sesi_tersimpan(id_sesi), proyek, sesi_sumber, jenis_kecocokan, halaman, per_halaman)
+
+@app.get("/sesi/{id_sesi}/error", tags=["Laporan Sesi"])
+def lihat_error_sesi(id_sesi: str, proyek: str | None = None, halaman: int = 1, per_halaman: int = 50):
+    return baca_error(path_laporan_sesi_tersimpan(id_sesi), proyek, halaman, per_halaman)
+
+@app.get("/berkas/{id_sesi}/{path_relatif:path}", tags=["Laporan Sesi"])
+def ambil_berkas_sesi(id_sesi: str, path_relatif: str):
+    # path_relatif sama dengan path_relatif_di_sesi di indeks master; file lepas maupun yang sudah dikemas
+    try:
+        konten = baca_berkas_sesi(OUTPUT_EKSTRAKSI_DIR, id_sesi, path_relatif)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return Response(content=konten, media_type=mimetypes.guess_type(path_relatif)[0] or "application/octet-stream")
+
+@app.get("/aturan_kelengkapan", tags=["Validasi Ulang"])
+async def lihat_versi_aturan():
+    return {"versi_aktif": VERSI_ATURAN_KELENGKAPAN, "versi_tersedia": daftar_versi_aturan()}
+
+@app.post("/revalidasi", tags=["Validasi Ulang"])
+def revalidasi_sesi_tersimpan(id_sesi: List[str] = Body(...), versi_aturan: str = Body(...)):
+    # Hanya membaca laporan_kontekstual tersimpan; ekstraksi dan model AI tidak dijalankan ulang
+    try:
+        return revalidasi_sesi(str(OUTPUT_EKSTRAKSI_DIR), id_sesi, versi_aturan, MAKS_WORKER_REVALIDASI)
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/duplikat/metadata", tags=["Pencarian Duplikat"])
+def cari_duplikat_metadata(teks: str, ambang_jarak: int = Query(AMBANG_JARAK_FUZZY, ge=0, le=AMBANG_JARAK_FUZZY)):
+    # Endpoint sinkron: pencarian fuzzy memakai CPU sehingga dijalankan di threadpool
+    return cari_berdasarkan_metadata(teks, ambang_jarak)
+
+@app.post("/duplikat/metadata/batch", tags=["Pencarian Duplikat"])
+def cari_duplikat_metadata_batch(daftar_teks: List[str] = Body(...), ambang_jarak: int = Query(AMBANG_JARAK_FUZZY, ge=0, le=AMBANG_JARAK_FUZZY)):
+    if len(daftar_teks) > MAKS_TEKS_BATCH:
+        raise HTTPException(status_code=400, detail=f"Maksimal {MAKS_TEKS_BATCH} teks per permintaan.")
+    return {"hasil": cari_batch_berdasarkan_metadata(daftar_teks, ambang_jarak)}
+
+@app.post("/duplikat/gambar", tags=["Pencarian Duplikat"])
+def cari_duplikat_gambar(files: List[UploadFile] = File(...), ambang_jarak: int = Query(AMBANG_JARAK_FUZZY, ge=0, le=AMBANG_JARAK_FUZZY)):
+    # Endpoint sinkron: OCR berjalan di threadpool sehingga tidak memblokir event loop
+    hasil = []
+    for file in files:
+        try:
+            with Image.open(io.BytesIO(file.file.read())) as img:
+                hasil_pencarian = cari_berdasarkan_gambar(img, ambang_jarak)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Gagal membaca gambar {file.filename}: {e}")
+        hasil.append({"nama_file": file.filename, **hasil_pencarian})
+    return {"hasil": hasil}
 
 @app.get("/", tags=["Status"])
 async def root():
@@ -0,0 +1,115 @@
+# backend/pencocokan_fuzzy.py
+# Pencocokan fuzzy teks metadata hasil OCR menggunakan indeks segmen (filter pigeonhole).
+# Setiap kunci dipotong menjadi JUMLAH_SEGMEN segmen berurutan yang diindeks menurut
+# (panjang kunci, nomor segmen, isi segmen). Kandidat dibangkitkan dari segmen kueri yang
+# paling jarang, disaring dengan jumlah segmen yang utuh, lalu diurutkan ulang dengan jarak
+# edit berbobot kerancuan OCR terhadap ambang yang bisa diatur.
+
+from typing import Dict, List, Any, Iterable, Tuple
+
+# Mendukung ambang_jarak sampai JUMLAH_SEGMEN - 1; segmen yang utuh wajib minimal JUMLAH_SEGMEN - ambang
+JUMLAH_SEGMEN = 6
+PANJANG_MIN_FUZZY = 10
+
+# Karakter dalam satu kelompok sering tertukar saat OCR (0/O, 1/l/I, -/.); pertukarannya berbiaya 1.
+# Substitusi lain antar huruf/tanda baca berbiaya 2. Angka tidak pernah boleh berubah, hilang, atau
+# bertambah: "10:21:05" dan "10:21:07" adalah foto yang berbeda, bukan salah baca.
+KELOMPOK_KERANCUAN_OCR = ["0OoDQ", "1lIi|!", "5Ss", "8B", "2Zz", "6G", "9g", "-.,_", ":;"]
+BIAYA_KERANCUAN, BIAYA_SUBSTITUSI, BIAYA_SISIP_HAPUS = 1, 2, 1
+_KELOMPOK_KARAKTER = {c: i for i, kelompok in enumerate(KELOMPOK_KERANCUAN_OCR) for c in kelompok}
+
+def biaya_substitusi(a: str, b: str, terlarang: int) -> int:
+    if a == b: return 0
+    kelompok_a = _KELOMPOK_KARAKTER.get(a)
+    if kelompok_a is not None and kelompok_a == _KELOMPOK_KARAKTER.get(b): return BIAYA_KERANCUAN
+    if a.isdigit() or b.isdigit(): return terlarang
+    return BIAYA_SUBSTITUSI
+
+def biaya_sisip_hapus(c: str, terlarang: int) -> int:
+    return terlarang if c.isdigit() else BIAYA_SISIP_HAPUS
+
+def partisi_segmen(panjang: int, jumlah: int = JUMLAH_SEGMEN) -> List[Tuple[int, int]]:
+    """Membagi teks sepanjang `panjang` menjadi `jumlah` segmen (awal, panjang) yang hampir sama besar."""
+    pendek, sisa = divmod(panjang, jumlah)
+    hasil, awal = [], 0
+    for i in range(jumlah):
+        ukuran = pendek + (1 if i >= jumlah - sisa else 0)
+        hasil.append((awal, ukuran))
+        awal += ukuran
+    return hasil
+
+def bangun_indeks_fuzzy(daftar_kunci: Iterable[str], jumlah_segmen: int = JUMLAH_SEGMEN) -> Dict[str, Any]:
+    indeks = {"jumlah_segmen": jumlah_segmen, "posting": {}}
+    for kunci in daftar_kunci:
+        tambah_ke_indeks_fuzzy(indeks, kunci)
+    return indeks
+
+def tambah_ke_indeks_fuzzy(indeks: Dict[str, Any], kunci: str) -> None:
+    # Kunci indeks master hanya pernah ditambahkan sekali, jadi posting cukup berupa list
+    posting, jumlah_segmen = indeks["posting"], indeks["jumlah_segmen"]
+    if len(kunci) < jumlah_segmen: return
+    for i, (awal, ukuran) in enumerate(partisi_segmen(len(kunci), jumlah_segmen)):
+        posting.setdefault((len(kunci), i, kunci[awal:awal + ukuran]), []).append(kunci)
+
+def jarak_edit(a: str, b: str, batas: int) -> int:
+    """
+    Jarak edit berbobot kerancuan OCR dengan pita selebar `batas`. Setiap operasi berbiaya >= 1,
+    sehingga pita dan filter segmen tetap valid. Mengembalikan batas + 1 begitu jarak
+    dipastikan melebihi batas, sehingga kandidat yang jauh berhenti lebih awal.
+    """
+    terlarang = batas + 1
+    if abs(len(a) - len(b)) > batas: return terlarang
+    if len(a) < len(b): a, b = b, a
+    baris_sebelum = [0] * (len(b) + 1)
+    for j in range(1, len(b) + 1):
+        baris_sebelum[j] = min(baris_sebelum[j - 1] + biaya_sisip_hapus(b[j - 1], terlarang), terlarang)
+    for i, ca in enumerate(a, 1):
+        hapus_ca = biaya_sisip_hapus(ca, terlarang)
+        baris = [min(baris_sebelum[0] + hapus_ca, terlarang)] + [terlarang] * len(b)
+        awal, akhir = max(1, i - batas), min(len(b), i + batas)
+        for j in range(awal, akhir + 1):
+            cb = b[j - 1]
+            baris[j] = min(baris_sebelum[j] + hapus_ca, baris[j - 1] + biaya_sisip_hapus(cb, terlarang), baris_sebelum[j - 1] + biaya_substitusi(ca, cb, terlarang), terlarang)
+        if min(baris[max(0, awal - 1):akhir + 1]) > batas:
+            return batas + 1
+        baris_sebelum = baris
+    return min(baris_sebelum[len(b)], batas + 1)
+
+def cari_kandidat_fuzzy(indeks: Dict[str, Any], teks: str, ambang_jarak: int = 2, maks_hasil: int = 5) -> List[Tuple[str, int]]:
+    """
+    Mengembalikan daftar (kunci, jarak_edit) dengan jarak <= ambang_jarak, terurut dari yang terdekat.
+    Setiap operasi edit berbiaya >= 1 dan merusak paling banyak satu segmen kunci, sehingga kunci yang
+    cocok menyisakan minimal (jumlah_segmen - ambang_jarak) segmen utuh, masing-masing bergeser paling
+    jauh ambang_jarak posisi di teks kueri. Akibatnya kunci itu pasti muncul di salah satu dari
+    (ambang_jarak + 1) segmen mana pun, dan dipilih segmen dengan posting list paling pendek.
+    """
+    posting, jumlah_segmen = indeks["posting"], indeks["jumlah_segmen"]
+    ambang_jarak = min(ambang_jarak, jumlah_segmen - 1)
+    if ambang_jarak <= 0 or len(teks) < PANJANG_MIN_FUZZY:
+        return []
+    panjang_kueri, minimal_utuh = len(teks), jumlah_segmen - ambang_jarak
+
+    hasil = []
+    for panjang in range(max(jumlah_segmen, panjang_kueri - ambang_jarak), panjang_kueri + ambang_jarak + 1):
+        partisi = partisi_segmen(panjang, jumlah_segmen)
+        posting_per_segmen = []
+        for i, (awal, ukuran) in enumerate(partisi):
+            daftar = [posting[k] for geser in range(max(0, awal - ambang_jarak), min(panjang_kueri - ukuran, awal + ambang_jarak) + 1) if (k := (panjang, i, teks[geser:geser + ukuran])) in posting]
+            posting_per_segmen.append((sum(map(len, daftar)), daftar))
+        posting_per_segmen.sort(key=lambda item: item[0])
+
+        kandidat = set()
+        for _, daftar in posting_per_segmen[:ambang_jarak + 1]:
+            for daftar_kunci in daftar:
+                kandidat.update(daftar_kunci)
+
+        for kunci in kandidat:
+            if kunci == teks: continue
+            # Filter hitungan: segmen kandidat yang utuh harus ditemukan di sekitar posisinya pada kueri
+            utuh = sum(1 for awal, ukuran in partisi if teks.find(kunci[awal:awal + ukuran], max(0, awal - ambang_jarak), awal + ukuran + ambang_jarak) >= 0)
+            if utuh < minimal_utuh: continue
+            jarak = jarak_edit(teks, kunci, ambang_jarak)
+            if jarak <= ambang_jarak:
+                hasil.append((kunci, jarak))
+    hasil.sort(key=lambda item: (item[1], item[0]))
+    return hasil[:maks_hasil]
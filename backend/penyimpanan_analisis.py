@@ -0,0 +1,138 @@
+# backend/penyimpanan_analisis.py
+# Format biner kolumnar untuk hasil analisis token per halaman (pengganti laporan_kontekstual.json).
+#
+# Isi file .npz (tanpa kompresi agar setiap array bisa di-memory-map langsung dari file):
+#   kosakata_token  : string token unik            id_token : int32  [N]
+#   kosakata_label  : string label unik            label    : uint8  [N]
+#   box             : int16 [N, 4] (koordinat ter-normalisasi 0-1000)
+#   offset_halaman  : int64 [P + 1]  -> token halaman ke-i ada di [offset[i], offset[i+1])
+#   nomor_halaman   : int32 [P]
+#   dpi_render      : int16 [P]  -> DPI render halaman (-1 jika tidak dicatat); opsional pada file lama
+
+import json
+import struct
+import zipfile
+import numpy as np
+from typing import List, Dict, Any
+
+VERSI_FORMAT = 1
+
+def simpan_laporan_kontekstual_kompak(laporan_kontekstual: List[Dict[str, Any]], path_output: str) -> None:
+    kosakata_token, kosakata_label = {}, {}
+    id_token, label, box, offset_halaman, nomor_halaman, dpi_render = [], [], [], [0], [], []
+
+    for halaman in laporan_kontekstual:
+        for item in halaman.get("analisis", {}).get("hasil_analisis_kontekstual", []):
+            id_token.append(kosakata_token.setdefault(item["token"], len(kosakata_token)))
+            label.append(kosakata_label.setdefault(item["label"], len(kosakata_label)))
+            box.append(item["box"])
+        offset_halaman.append(len(id_token))
+        nomor_halaman.append(halaman["halaman"])
+        dpi_render.append(halaman.get("dpi_render", -1))
+
+    if len(kosakata_label) > 256: raise ValueError("Jumlah label melebihi kapasitas uint8.")
+
+    np.savez(
+        path_output,
+        versi=np.array(VERSI_FORMAT, dtype=np.int32),
+        kosakata_token=np.array(list(kosakata_token), dtype=str),
+        id_token=np.array(id_token, dtype=np.int32),
+        kosakata_label=np.array(list(kosakata_label), dtype=str),
+        label=np.array(label, dtype=np.uint8),
+        box=np.array(box, dtype=np.int16).reshape(-1, 4),
+        offset_halaman=np.array(offset_halaman, dtype=np.int64),
+        nomor_halaman=np.array(nomor_halaman, dtype=np.int32),
+        dpi_render=np.array(dpi_render, dtype=np.int16),
+    )
+
+def _memmap_array_npz(path_npz: str, nama: str) -> np.ndarray:
+    """Memetakan satu array di dalam .npz tak terkompresi langsung ke memori (tanpa membaca seluruh file)."""
+    with zipfile.ZipFile(path_npz) as zf:
+        info = zf.getinfo(f"{nama}.npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        with np.load(path_npz, allow_pickle=False) as data:
+            return data[nama]
+
+    with open(path_npz, "rb") as f:
+        # Lewati local file header ZIP (30 byte + nama file + extra field)
+        f.seek(info.header_offset)
+        header_lokal = f.read(30)
+        panjang_nama, panjang_extra = struct.unpack("<HH", header_lokal[26:30])
+        f.seek(info.header_offset + 30 + panjang_nama + panjang_extra)
+        versi = np.lib.format.read_magic(f)
+        if versi == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset_data = f.tell()
+
+    if 0 in shape:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path_npz, dtype=dtype, mode="r", shape=shape, offset=offset_data, order="F" if fortran_order else "C")
+
+class LaporanKontekstualKompak:
+    """
+    Pembaca malas untuk file hasil simpan_laporan_kontekstual_kompak. Array besar di-memory-map,
+    dan token satu halaman baru diubah menjadi dict saat halaman tersebut diminta.
+    """
+
+    def __init__(self, path_npz: str):
+        self.path = str(path_npz)
+        self._array = {}
+        with zipfile.ZipFile(self.path) as zf:
+            self._nama_array = {nama[:-len(".npy")] for nama in zf.namelist()}
+        versi = int(self._ambil("versi"))
+        if versi != VERSI_FORMAT: raise ValueError(f"Versi format {versi} tidak didukung (diharapkan {VERSI_FORMAT}).")
+
+    def _ambil(self, nama: str) -> np.ndarray:
+        if nama not in self._array:
+            self._array[nama] = _memmap_array_npz(self.path, nama)
+        return self._array[nama]
+
+    def __len__(self) -> int:
+        return len(self._ambil("nomor_halaman"))
+
+    def __iter__(self):
+        for indeks in range(len(self)):
+            yield self.halaman(indeks)
+
+    def halaman(self, indeks: int) -> Dict[str, Any]:
+        """Mengembalikan halaman ke-`indeks` (berbasis 0) dalam struktur yang sama dengan laporan_kontekstual.json."""
+        offset = self._ambil("offset_halaman")
+        awal, akhir = int(offset[indeks]), int(offset[indeks + 1])
+        kosakata_token, kosakata_label = self._ambil("kosakata_token"), self._ambil("kosakata_label")
+        id_token = self._ambil("id_token")[awal:akhir]
+        label = self._ambil("label")[awal:akhir]
+        box = self._ambil("box")[awal:akhir].tolist()
+        token = [
+            {"token": str(kosakata_token[t]), "label": str(kosakata_label[l]), "box": b}
+            for t, l, b in zip(id_token, label, box)
+        ]
+        hasil = {"halaman": int(self._ambil("nomor_halaman")[indeks]), "analisis": {"hasil_analisis_kontekstual": token}}
+        if "dpi_render" in self._nama_array and self._ambil("dpi_render")[indeks] >= 0:
+            hasil["dpi_render"] = int(self._ambil("dpi_render")[indeks])
+        return hasil
+
+    def ke_list(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+def ekspor_ke_json(path_npz: str, path_json: str) -> None:
+    """Menulis ulang file kompak sebagai laporan_kontekstual.json untuk keperluan debugging."""
+    with open(path_json, "w", encoding="utf-8") as f:
+        json.dump(LaporanKontekstualKompak(path_npz).ke_list(), f, indent=4, ensure_ascii=False)
+
+def muat_laporan_kontekstual(path_laporan: str) -> List[Dict[str, Any]]:
+    """Memuat laporan kontekstual dari format kompak (.npz) maupun JSON lama."""
+    if str(path_laporan).endswith(".npz"):
+        return LaporanKontekstualKompak(path_laporan).ke_list()
+    with open(path_laporan, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Ekspor laporan_kontekstual.npz ke JSON untuk debugging.")
+    parser.add_argument("npz", help="Path ke file laporan_kontekstual.npz.")
+    parser.add_argument("json", help="Path file JSON output.")
+    args = parser.parse_args()
+    ekspor_ke_json(args.npz, args.json)
+    print(f"Laporan diekspor ke: {args.json}")
@@ -0,0 +1,93 @@
+# backend/progres.py
+# Kanal progres per sesi untuk Server-Sent Events (SSE). Callback progres dari thread pemrosesan
+# hanya menimpa "event terakhir" sesi; stream SSE memeriksanya setiap INTERVAL_KIRIM detik dan
+# mengirim event hanya jika ada perubahan. Dengan begitu tahap yang cepat (ribuan callback per
+# detik) dikoalesensi menjadi paling banyak beberapa event per detik per koneksi.
+
+import time
+import json
+import asyncio
+import threading
+from typing import Dict, Any, AsyncIterator
+
+INTERVAL_KIRIM = 0.25
+INTERVAL_HEARTBEAT = 15
+MASA_SIMPAN_SELESAI = 300
+# Kanal yang dibuat (POST /sesi) tetapi tidak pernah menerima event apa pun, mis. tidak ada unggahan
+MASA_SIMPAN_TANPA_AKTIVITAS = 3600
+
+_KANAL: Dict[str, Dict[str, Any]] = {}
+_KUNCI = threading.Lock()
+
+def buat_kanal_progres(id_sesi: str) -> None:
+    with _KUNCI:
+        _bersihkan_kanal_lama()
+        _KANAL.setdefault(id_sesi, {"versi": 0, "event": None, "selesai": False, "waktu_dibuat": time.monotonic(), "waktu_selesai": None, "mulai_tahap": {}})
+
+def kanal_ada(id_sesi: str) -> bool:
+    with _KUNCI:
+        return id_sesi in _KANAL
+
+def _perbarui_event(id_sesi: str, event: Dict[str, Any]) -> None:
+    kanal = _KANAL.get(id_sesi)
+    if kanal is None: return
+    kanal["event"] = event
+    kanal["versi"] += 1
+
+def laporkan_progres(id_sesi: str, tahap: str, proyek: str, current: int, total: int) -> None:
+    sekarang = time.monotonic()
+    with _KUNCI:
+        kanal = _KANAL.get(id_sesi)
+        if kanal is None: return
+        mulai = kanal["mulai_tahap"].setdefault((proyek, tahap), sekarang)
+        _perbarui_event(id_sesi, {
+            "tipe": "progres",
+            "tahap": tahap,
+            "proyek": proyek,
+            "current": current,
+            "total": total,
+            "elapsed_tahap_detik": round(sekarang - mulai, 2)
+        })
+
+def laporkan_status(id_sesi: str, tipe: str, **data) -> None:
+    with _KUNCI:
+        _perbarui_event(id_sesi, {"tipe": tipe, **data})
+
+def tandai_selesai(id_sesi: str, **ringkasan) -> None:
+    with _KUNCI:
+        kanal = _KANAL.get(id_sesi)
+        if kanal is None: return
+        _perbarui_event(id_sesi, {"tipe": "selesai", **ringkasan})
+        kanal["selesai"] = True
+        kanal["waktu_selesai"] = time.monotonic()
+
+def _bersihkan_kanal_lama() -> None:
+    sekarang = time.monotonic()
+    for id_sesi in [
+        i for i, k in _KANAL.items()
+        if (k["selesai"] and k["waktu_selesai"] < sekarang - MASA_SIMPAN_SELESAI)
+        or (k["versi"] == 0 and k["waktu_dibuat"] < sekarang - MASA_SIMPAN_TANPA_AKTIVITAS)
+    ]:
+        del _KANAL[id_sesi]
+
+async def stream_progres(id_sesi: str) -> AsyncIterator[str]:
+    versi_terkirim, terakhir_kirim = -1, time.monotonic()
+    while True:
+        with _KUNCI:
+            kanal = _KANAL.get(id_sesi)
+            if kanal is None:
+                yield f"data: {json.dumps({'tipe': 'error', 'message': 'Sesi tidak dikenal.'})}\n\n"
+                return
+            versi, event, selesai = kanal["versi"], kanal["event"], kanal["selesai"]
+
+        if versi != versi_terkirim and event is not None:
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            versi_terkirim, terakhir_kirim = versi, time.monotonic()
+        elif time.monotonic() - terakhir_kirim > INTERVAL_HEARTBEAT:
+            # Komentar SSE menjaga koneksi tetap hidup melewati proxy saat tahap berjalan lama
+            yield ": heartbeat\n\n"
+            terakhir_kirim = time.monotonic()
+
+        if selesai:
+            return
+        await asyncio.sleep(INTERVAL_KIRIM)
@@ -0,0 +1,67 @@
+# backend/render_halaman.py
+# Render halaman PDF dengan DPI adaptif. DPI dipilih dari ukuran font & kepadatan teks halaman
+# (statistik PyMuPDF), lalu dibatasi total piksel agar halaman besar (A3 as-built drawing)
+# tidak menghasilkan raster raksasa yang toh akan diperkecil processor ke 224x224.
+
+import math
+import statistics
+import fitz
+from PIL import Image
+from typing import Dict, Any, Tuple
+
+DPI_BAWAAN = 200            # dipakai jika halaman tidak punya lapisan teks (hasil scan)
+DPI_MIN = 72
+DPI_MAKS = 300
+DPI_GAMBAR_TEKNIK = 100     # jalur murah untuk halaman yang didominasi gambar vektor
+MAKS_PIKSEL = 4_000_000     # ~A4 pada 200 dpi
+TARGET_PIKSEL_FONT = 28     # tinggi font (piksel) yang nyaman dibaca Tesseract
+AMBANG_JUMLAH_DRAWING = 500
+AMBANG_KARAKTER_PER_INCI2 = 20
+
+def statistik_halaman(page: fitz.Page) -> Dict[str, Any]:
+    ukuran_font, jumlah_karakter = [], 0
+    # TEXTFLAGS_TEXT tanpa TEXT_PRESERVE_IMAGES: byte gambar tidak ikut diekstrak hanya untuk statistik font
+    for blok in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+        if blok.get("type") != 0: continue
+        for baris in blok["lines"]:
+            for span in baris["spans"]:
+                teks = span["text"].strip()
+                if teks:
+                    ukuran_font.append(span["size"])
+                    jumlah_karakter += len(teks)
+    try:
+        jumlah_drawing = len(page.get_cdrawings())
+    except AttributeError:
+        jumlah_drawing = len(page.get_drawings())
+
+    luas_inci2 = (page.rect.width / 72) * (page.rect.height / 72)
+    return {
+        "lebar_pt": page.rect.width,
+        "tinggi_pt": page.rect.height,
+        "jumlah_karakter": jumlah_karakter,
+        "median_ukuran_font": statistics.median(ukuran_font) if ukuran_font else None,
+        "karakter_per_inci2": jumlah_karakter / luas_inci2 if luas_inci2 else 0,
+        "jumlah_drawing": jumlah_drawing
+    }
+
+def pilih_dpi(statistik: Dict[str, Any], dpi_bawaan: int = DPI_BAWAAN, dpi_maks: int = DPI_MAKS, maks_piksel: int = MAKS_PIKSEL) -> Tuple[int, str]:
+    if statistik["jumlah_drawing"] >= AMBANG_JUMLAH_DRAWING and statistik["karakter_per_inci2"] < AMBANG_KARAKTER_PER_INCI2:
+        dpi, alasan = DPI_GAMBAR_TEKNIK, "gambar_teknik"
+    elif statistik["median_ukuran_font"]:
+        # Font kecil butuh DPI lebih tinggi, font besar cukup DPI rendah
+        dpi, alasan = TARGET_PIKSEL_FONT * 72 / statistik["median_ukuran_font"], "ukuran_font"
+    else:
+        dpi, alasan = dpi_bawaan, "tanpa_lapisan_teks"
+    dpi = max(DPI_MIN, min(dpi, dpi_maks))
+
+    dpi_batas_piksel = 72 * math.sqrt(maks_piksel / (statistik["lebar_pt"] * statistik["tinggi_pt"]))
+    if dpi > dpi_batas_piksel:
+        dpi, alasan = dpi_batas_piksel, alasan + "+batas_piksel"
+    return max(1, int(dpi)), alasan
+
+def render_halaman_adaptif(page: fitz.Page, dpi_bawaan: int = DPI_BAWAAN, dpi_maks: int = DPI_MAKS, maks_piksel: int = MAKS_PIKSEL) -> Tuple[Image.Image, Dict[str, Any]]:
+    statistik = statistik_halaman(page)
+    dpi, alasan = pilih_dpi(statistik, dpi_bawaan, dpi_maks, maks_piksel)
+    pix = page.get_pixmap(dpi=dpi)
+    image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    return image, {"dpi": dpi, "alasan": alasan, "ukuran_piksel": [pix.width, pix.height], **statistik}
@@ -0,0 +1,100 @@
+# backend/revalidasi.py
+# Validasi ulang kelengkapan dokumen untuk sesi yang sudah tersimpan, tanpa menjalankan ulang
+# ekstraksi maupun LayoutLMv3. Aturan kelengkapan dibaca dari file JSON berversi di aturan_kelengkapan/.
+
+import os
+import re
+import json
+import argparse
+import multiprocessing
+from pathlib import Path
+from typing import List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from validasi_konten import cek_kelengkapan_dokumen
+from penyimpanan_analisis import muat_laporan_kontekstual
+
+DIR_ATURAN_KELENGKAPAN = Path(__file__).resolve().parent / "aturan_kelengkapan"
+NAMA_FILE_LAPORAN_KONTEKSTUAL = ["laporan_kontekstual.npz", "laporan_kontekstual.json"]
+# Tidak boleh diawali titik agar "." / ".." tidak pernah lolos sebagai nama
+POLA_NAMA_AMAN = re.compile(r"^[\w\-][\w.\-]*$")
+# Format ID sesi dari main.buat_id_sesi: YYYYmmdd-HHMMSS_<8 hex uuid>
+POLA_ID_SESI = re.compile(r"^\d{8}-\d{6}_[0-9a-f]{8}$")
+
+def daftar_versi_aturan() -> List[str]:
+    return sorted(p.stem for p in DIR_ATURAN_KELENGKAPAN.glob("*.json"))
+
+def muat_aturan_kelengkapan(versi: str) -> Dict[str, Any]:
+    if not POLA_NAMA_AMAN.match(versi): raise ValueError(f"Nama versi aturan tidak valid: {versi}")
+    path_aturan = DIR_ATURAN_KELENGKAPAN / f"{versi}.json"
+    if not path_aturan.exists(): raise FileNotFoundError(f"Aturan kelengkapan versi '{versi}' tidak ditemukan.")
+    with open(path_aturan, "r", encoding="utf-8") as f:
+        aturan = json.load(f)
+    aturan.setdefault("versi", versi)
+    return aturan
+
+def cari_laporan_kontekstual(path_proyek: Path) -> Path | None:
+    for nama_file in NAMA_FILE_LAPORAN_KONTEKSTUAL:
+        if (path_proyek / nama_file).exists():
+            return path_proyek / nama_file
+    return None
+
+def revalidasi_proyek(path_proyek: str, aturan: Dict[str, Any]) -> Dict[str, Any]:
+    """Dijalankan di proses worker: memuat laporan kontekstual tersimpan lalu menerapkan aturan."""
+    path_proyek = Path(path_proyek)
+    path_laporan = cari_laporan_kontekstual(path_proyek)
+    laporan_kontekstual = muat_laporan_kontekstual(str(path_laporan))
+    hasil = cek_kelengkapan_dokumen(laporan_kontekstual, aturan)
+
+    path_hasil = path_proyek / f"validasi_kelengkapan_{aturan['versi']}.json"
+    with open(path_hasil, "w", encoding="utf-8") as f:
+        json.dump(hasil, f, indent=4, ensure_ascii=False)
+    return {"sesi": path_proyek.parent.name, "proyek": path_proyek.name, "status_kelengkapan": hasil["status"], "versi_aturan": aturan["versi"]}
+
+def revalidasi_sesi(dir_output_ekstraksi: str, daftar_id_sesi: List[str], versi_aturan: str, maks_worker: int = None) -> Dict[str, Any]:
+    aturan = muat_aturan_kelengkapan(versi_aturan)
+
+    daftar_proyek, error_log = [], []
+    for id_sesi in daftar_id_sesi:
+        path_sesi = Path(dir_output_ekstraksi) / id_sesi
+        if not POLA_ID_SESI.match(id_sesi) or not path_sesi.is_dir():
+            error_log.append(f"Sesi tidak ditemukan: {id_sesi}")
+            continue
+        daftar_proyek.extend(str(p) for p in sorted(path_sesi.iterdir()) if p.is_dir() and cari_laporan_kontekstual(p))
+
+    hasil_proyek = []
+    # spawn, bukan fork: pemanggil API adalah proses uvicorn multi-thread dengan torch termuat,
+    # dan fork dari proses seperti itu bisa membuat worker deadlock
+    konteks = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=maks_worker, mp_context=konteks) as executor:
+        futures = {executor.submit(revalidasi_proyek, path_proyek, aturan): path_proyek for path_proyek in daftar_proyek}
+        for future in as_completed(futures):
+            try:
+                hasil_proyek.append(future.result())
+            except Exception as e:
+                error_log.append(f"Error pada proyek {futures[future]}: {e}")
+
+    hasil_proyek.sort(key=lambda h: (h["sesi"], h["proyek"]))
+    return {
+        "versi_aturan": aturan["versi"],
+        "jumlah_proyek": len(hasil_proyek),
+        "jumlah_lengkap": sum(1 for h in hasil_proyek if h["status_kelengkapan"] == "LENGKAP"),
+        "hasil_proyek": hasil_proyek,
+        "error_log": error_log
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Validasi ulang kelengkapan dokumen sesi tersimpan dengan aturan berversi.")
+    parser.add_argument("--output_ekstraksi", default="/app/data/output_ekstraksi", help="Direktori output_ekstraksi berisi folder sesi.")
+    parser.add_argument("--sesi", nargs="*", help="ID sesi yang akan divalidasi ulang. Default: semua sesi.")
+    parser.add_argument("--versi_aturan", required=True, help=f"Versi aturan kelengkapan. Tersedia: {', '.join(daftar_versi_aturan())}")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Jumlah proses worker paralel.")
+    args = parser.parse_args()
+
+    daftar_id_sesi = args.sesi or sorted(p.name for p in Path(args.output_ekstraksi).iterdir() if p.is_dir() and POLA_ID_SESI.match(p.name))
+    print(f"Memvalidasi ulang {len(daftar_id_sesi)} sesi dengan aturan versi '{args.versi_aturan}'...")
+    hasil = revalidasi_sesi(args.output_ekstraksi, daftar_id_sesi, args.versi_aturan, args.workers)
+    print(f"Selesai: {hasil['jumlah_proyek']} proyek, {hasil['jumlah_lengkap']} lengkap, {len(hasil['error_log'])} error.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# backend/siklus_penyimpanan.py
+# Siklus hidup penyimpanan output_ekstraksi. Sesi yang sudah selesai dipadatkan: semua folder
+# halaman_N/ satu proyek dikemas menjadi satu file zip (central directory zip menjadi indeks untuk
+# akses acak per file), visualisasi debug dibuang, dan setelah masa retensi isi kemasan dipangkas
+# sampai hanya file yang masih dirujuk indeks master / laporan duplikat yang tersisa.
+# File di root proyek (laporan_kontekstual.npz, laporan_validasi_proyek.json, _summary.json)
+# tidak dikemas agar revalidasi tetap berjalan tanpa perubahan.
+
+import os
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import zipfile
+from pathlib import Path
+from datetime import datetime
+from contextlib import closing
+from typing import Dict, Set, Any
+
+from revalidasi import POLA_ID_SESI
+from laporan_sesi import path_db_sesi
+
+PATH_KONFIGURASI_RETENSI = Path(__file__).resolve().parent / "konfigurasi_retensi.json"
+NAMA_FILE_KEMASAN = "aset_halaman.zip"
+NAMA_FILE_STATUS = "status_penyimpanan.json"
+# Penanda sesi selesai: ditulis di akhir pemrosesan sesi (juga oleh sesi lama sebelum laporan SQLite)
+NAMA_FILE_SESI_SELESAI = "laporan_sesi_keseluruhan.json"
+AKHIRAN_VISUAL_DEBUG = "_analisis_visual.png"
+# Gambar sudah terkompresi, hanya teks yang dikompresi ulang
+EKSTENSI_DIKOMPRESI = (".txt", ".json")
+UKURAN_BUFFER_SALIN = 1024 * 1024
+
+KONFIGURASI_BAWAAN = {
+    "interval_pemadatan_menit": 60,
+    "kemas_setelah_jam": 24,
+    "hapus_visual_debug": True,
+    "pangkas_setelah_hari": 90,
+}
+
+def muat_konfigurasi_retensi(path_konfigurasi: str | Path = PATH_KONFIGURASI_RETENSI) -> Dict[str, Any]:
+    konfigurasi = dict(KONFIGURASI_BAWAAN)
+    if Path(path_konfigurasi).exists():
+        with open(path_konfigurasi, "r", encoding="utf-8") as f:
+            konfigurasi.update(json.load(f))
+    return konfigurasi
+
+def kumpulkan_referensi(indeks_master: Dict[str, Any]) -> Dict[str, Set[str]]:
+    """Mengelompokkan path_relatif_di_sesi dari indeks master per sesi asal."""
+    referensi: Dict[str, Set[str]] = {}
+    for petunjuk in indeks_master.values():
+        referensi.setdefault(petunjuk["sesi_asli"], set()).add(petunjuk["path_relatif_di_sesi"])
+    return referensi
+
+def _referensi_laporan_sesi(path_sesi: Path) -> Set[str]:
+    """Gambar sesi ini yang tercatat sebagai duplikat di laporan sesi tetap dipertahankan sebagai bukti."""
+    if not path_db_sesi(path_sesi).exists(): return set()
+    with closing(sqlite3.connect(path_db_sesi(path_sesi))) as conn:
+        return {baris[0] for baris in conn.execute("SELECT path FROM duplikat")}
+
+def _baca_status(path_sesi: Path) -> Dict[str, Any]:
+    path_status = path_sesi / NAMA_FILE_STATUS
+    if not path_status.exists(): return {}
+    with open(path_status, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _tulis_status(path_sesi: Path, status: Dict[str, Any]) -> None:
+    path_sementara = path_sesi / (NAMA_FILE_STATUS + ".tmp")
+    with open(path_sementara, "w", encoding="utf-8") as f:
+        json.dump(status, f, indent=4, ensure_ascii=False)
+    os.replace(path_sementara, path_sesi / NAMA_FILE_STATUS)
+
+def _jenis_kompresi(nama_entri: str) -> int:
+    return zipfile.ZIP_DEFLATED if nama_entri.endswith(EKSTENSI_DIKOMPRESI) else zipfile.ZIP_STORED
+
+def _tulis_kemasan(path_kemasan: Path, file_lepas: Dict[str, Path], entri_dipertahankan: Set[str] | None = None) -> None:
+    """
+    Menulis ulang kemasan secara atomik. Entri kemasan lama (semua, atau hanya `entri_dipertahankan`)
+    disalin satu per satu secara streaming sehingga isi arsip tidak pernah dimuat utuh ke memori;
+    `file_lepas` (nama entri -> Path) menimpa entri lama bernama sama.
+    """
+    path_sementara = path_kemasan.with_name(path_kemasan.name + ".tmp")
+    with zipfile.ZipFile(path_sementara, "w") as zf_baru:
+        if path_kemasan.exists():
+            with zipfile.ZipFile(path_kemasan) as zf_lama:
+                for info in zf_lama.infolist():
+                    if info.filename in file_lepas: continue
+                    if entri_dipertahankan is not None and info.filename not in entri_dipertahankan: continue
+                    info_baru = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                    info_baru.compress_type = _jenis_kompresi(info.filename)
+                    # file_size diisi agar zipfile memilih ZIP64 sendiri untuk entri besar
+                    info_baru.file_size = info.file_size
+                    with zf_lama.open(info) as sumber, zf_baru.open(info_baru, "w") as tujuan:
+                        shutil.copyfileobj(sumber, tujuan, UKURAN_BUFFER_SALIN)
+        for nama_entri, path_file in sorted(file_lepas.items()):
+            zf_baru.write(path_file, nama_entri, compress_type=_jenis_kompresi(nama_entri))
+    os.replace(path_sementara, path_kemasan)
+
+def kemas_proyek(path_proyek: Path, hapus_visual_debug: bool = True) -> int:
+    """
+    Mengemas semua file di halaman_N/ ke NAMA_FILE_KEMASAN. Nama entri relatif terhadap folder sesi,
+    sama dengan path_relatif_di_sesi di indeks master. Folder lepas baru dihapus setelah zip selesai
+    ditulis; jika proses terhenti di tengah, pemanggilan berikutnya menggabungkan ulang dengan aman.
+    """
+    path_sesi = path_proyek.parent
+    folder_halaman = [p for p in path_proyek.iterdir() if p.is_dir() and p.name.startswith("halaman_")]
+    if not folder_halaman: return 0
+
+    file_lepas: Dict[str, Path] = {}
+    for folder in folder_halaman:
+        for path_file in folder.rglob("*"):
+            if not path_file.is_file(): continue
+            if hapus_visual_debug and path_file.name.endswith(AKHIRAN_VISUAL_DEBUG): continue
+            file_lepas[path_file.relative_to(path_sesi).as_posix()] = path_file
+
+    _tulis_kemasan(path_proyek / NAMA_FILE_KEMASAN, file_lepas)
+    for folder in folder_halaman:
+        shutil.rmtree(folder)
+    return len(file_lepas)
+
+def pangkas_kemasan(path_proyek: Path, path_dipertahankan: Set[str]) -> int:
+    """Menulis ulang kemasan hanya dengan entri yang masih dirujuk (teks halaman selalu dipertahankan)."""
+    path_kemasan = path_proyek / NAMA_FILE_KEMASAN
+    if not path_kemasan.exists(): return 0
+    with zipfile.ZipFile(path_kemasan) as zf:
+        semua_nama = zf.namelist()
+        dipertahankan = [n for n in semua_nama if n in path_dipertahankan or n.endswith(".txt")]
+    if len(dipertahankan) == len(semua_nama): return 0
+    _tulis_kemasan(path_kemasan, {}, set(dipertahankan))
+    return len(semua_nama) - len(dipertahankan)
+
+def umur_sesi_selesai_detik(path_sesi: Path) -> float | None:
+    """None jika sesi belum selesai diproses (atau masih berjalan)."""
+    path_penanda = path_sesi / NAMA_FILE_SESI_SELESAI
+    if not path_penanda.exists(): return None
+    return time.time() - path_penanda.stat().st_mtime
+
+def padatkan_sesi(path_sesi: Path, konfigurasi: Dict[str, Any], referensi: Dict[str, Set[str]]) -> Dict[str, Any]:
+    hasil = {"sesi": path_sesi.name, "file_dikemas": 0, "file_dipangkas": 0}
+    umur = umur_sesi_selesai_detik(path_sesi)
+    if umur is None or umur < konfigurasi["kemas_setelah_jam"] * 3600:
+        return hasil
+
+    status = _baca_status(path_sesi)
+    batas_pangkas = konfigurasi.get("pangkas_setelah_hari")
+    perlu_pangkas = batas_pangkas is not None and umur >= batas_pangkas * 86400 and "dipangkas" not in status
+    if "dikemas" in status and not perlu_pangkas:
+        return hasil
+
+    daftar_proyek = sorted(p for p in path_sesi.iterdir() if p.is_dir())
+    for path_proyek in daftar_proyek:
+        hasil["file_dikemas"] += kemas_proyek(path_proyek, konfigurasi["hapus_visual_debug"])
+    status.setdefault("dikemas", datetime.now().isoformat(timespec="seconds"))
+
+    if perlu_pangkas:
+        path_dipertahankan = referensi.get(path_sesi.name, set()) | _referensi_laporan_sesi(path_sesi)
+        for path_proyek in daftar_proyek:
+            hasil["file_dipangkas"] += pangkas_kemasan(path_proyek, path_dipertahankan)
+        status["dipangkas"] = datetime.now().isoformat(timespec="seconds")
+
+    _tulis_status(path_sesi, status)
+    return hasil
+
+def jalankan_pemadatan(dir_output_ekstraksi: str | Path, referensi: Dict[str, Set[str]], konfigurasi: Dict[str, Any] = None) -> Dict[str, Any]:
+    konfigurasi = konfigurasi or muat_konfigurasi_retensi()
+    ringkasan = {"sesi_diperiksa": 0, "file_dikemas": 0, "file_dipangkas": 0, "error_log": []}
+    # Hanya folder bernama ID sesi; folder lain di output_ekstraksi tidak pernah disentuh
+    for path_sesi in sorted(p for p in Path(dir_output_ekstraksi).iterdir() if p.is_dir() and POLA_ID_SESI.match(p.name)):
+        ringkasan["sesi_diperiksa"] += 1
+        try:
+            hasil = padatkan_sesi(path_sesi, konfigurasi, referensi)
+        except Exception as e:
+            ringkasan["error_log"].append(f"Error pada sesi {path_sesi.name}: {e}")
+            continue
+        ringkasan["file_dikemas"] += hasil["file_dikemas"]
+        ringkasan["file_dipangkas"] += hasil["file_dipangkas"]
+    return ringkasan
+
+def baca_berkas_sesi(dir_output_ekstraksi: str | Path, id_sesi: str, path_relatif: str) -> bytes:
+    """
+    Membaca file sesi berdasarkan path relatif terhadap folder sesi (format path_relatif_di_sesi):
+    file lepas dicek dulu, lalu entri di kemasan proyeknya.
+    """
+    bagian = Path(path_relatif).parts
+    if not POLA_ID_SESI.match(id_sesi) or not bagian or Path(path_relatif).is_absolute() or ".." in bagian:
+        raise FileNotFoundError(f"Path tidak valid: {path_relatif}")
+
+    path_sesi = (Path(dir_output_ekstraksi) / id_sesi).resolve()
+    path_lepas = path_sesi.joinpath(*bagian).resolve()
+    # Pertahanan kedua (mis. symlink): path akhir harus tetap berada di dalam folder sesi
+    if not path_lepas.is_relative_to(path_sesi) or not path_sesi.is_relative_to(Path(dir_output_ekstraksi).resolve()):
+        raise FileNotFoundError(f"Path tidak valid: {path_relatif}")
+    if path_lepas.is_file():
+        return path_lepas.read_bytes()
+
+    path_kemasan = path_sesi / bagian[0] / NAMA_FILE_KEMASAN
+    if path_kemasan.exists():
+        with zipfile.ZipFile(path_kemasan) as zf:
+            try:
+                return zf.read("/".join(bagian))
+            except KeyError:
+                pass
+    raise FileNotFoundError(f"File tidak ditemukan: {id_sesi}/{path_relatif}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Memadatkan sesi output_ekstraksi yang sudah selesai sesuai kebijakan retensi.")
+    parser.add_argument("--output_ekstraksi", default="/app/data/output_ekstraksi", help="Direktori output_ekstraksi berisi folder sesi.")
+    parser.add_argument("--master_index", default="/app/data/sistem_validasi/master_index.json", help="File master_index.json untuk menentukan file yang masih dirujuk.")
+    parser.add_argument("--konfigurasi", default=str(PATH_KONFIGURASI_RETENSI), help="File JSON kebijakan retensi.")
+    args = parser.parse_args()
+
+    indeks_master = {}
+    if Path(args.master_index).exists():
+        with open(args.master_index, "r", encoding="utf-8") as f:
+            indeks_master = json.load(f)
+
+    hasil = jalankan_pemadatan(args.output_ekstraksi, kumpulkan_referensi(indeks_master), muat_konfigurasi_retensi(args.konfigurasi))
+    print(f"Selesai: {hasil['sesi_diperiksa']} sesi diperiksa, {hasil['file_dikemas']} file dikemas, {hasil['file_dipangkas']} file dipangkas, {len(hasil['error_log'])} error.")
+    for pesan in hasil["error_log"]:
+        print(f"[ERROR] {pesan}")
+
+if __name__ == "__main__":
+    main()
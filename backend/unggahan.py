@@ -0,0 +1,70 @@
+# backend/unggahan.py
+# Penerimaan file unggahan secara bertahap (per chunk): ditulis ke path unik per sesi,
+# di-hash sambil ditulis, dan divalidasi sebagai PDF sedini mungkin sehingga file rusak
+# ditolak sebelum tahap ekstraksi/AI yang mahal dimulai.
+
+import os
+import re
+import hashlib
+import fitz
+from pathlib import Path
+from typing import Dict, Any
+from fastapi import UploadFile
+
+UKURAN_CHUNK = 1024 * 1024
+BATAS_UKURAN_FILE = 200 * 1024 * 1024       # sama dengan batas di frontend
+BATAS_UKURAN_SESI = 2 * 1024 * 1024 * 1024
+PANJANG_EKOR = 4096                          # %%EOF/startxref harus ada di bagian akhir file
+
+class UnggahanDitolak(Exception):
+    pass
+
+def nama_file_aman(nama_file: str) -> str:
+    nama = re.sub(r'[^\w.\- ]', '_', Path(nama_file or "").name).strip()
+    # Nama kosong, "." / "..", atau diawali titik bisa menunjuk ke folder induk atau menjadi file tersembunyi
+    if not nama or nama.startswith("."):
+        return "tanpa_nama.pdf"
+    return nama
+
+def validasi_struktur_pdf(path_pdf: Path) -> int:
+    """Membuka PDF tanpa merender apa pun untuk memastikan xref/trailer bisa dibaca. Mengembalikan jumlah halaman."""
+    try:
+        doc = fitz.open(path_pdf)
+    except Exception as e:
+        raise UnggahanDitolak(f"Struktur PDF tidak dapat dibaca: {e}")
+    try:
+        if not doc.is_pdf: raise UnggahanDitolak("File bukan dokumen PDF.")
+        if doc.needs_pass: raise UnggahanDitolak("PDF terenkripsi/berpassword tidak dapat diproses.")
+        if doc.page_count == 0: raise UnggahanDitolak("PDF tidak memiliki halaman.")
+        return doc.page_count
+    finally:
+        doc.close()
+
+async def simpan_unggahan_bertahap(file: UploadFile, path_tujuan: Path, sisa_kuota_sesi: int, batas_ukuran_file: int = BATAS_UKURAN_FILE) -> Dict[str, Any]:
+    hasher = hashlib.sha256()
+    ukuran, ekor = 0, b""
+    try:
+        with open(path_tujuan, "wb") as buffer:
+            while chunk := await file.read(UKURAN_CHUNK):
+                if ukuran == 0 and b"%PDF-" not in chunk[:1024]:
+                    # Header PDF wajib ada di 1024 byte pertama; tolak tanpa membaca sisa file
+                    raise UnggahanDitolak("Header PDF tidak ditemukan, file bukan PDF.")
+                ukuran += len(chunk)
+                if ukuran > batas_ukuran_file:
+                    raise UnggahanDitolak(f"Ukuran file melebihi batas {batas_ukuran_file // (1024 * 1024)} MB.")
+                if ukuran > sisa_kuota_sesi:
+                    raise UnggahanDitolak("Total ukuran unggahan sesi melebihi batas.")
+                hasher.update(chunk)
+                buffer.write(chunk)
+                ekor = (ekor + chunk)[-PANJANG_EKOR:]
+
+        if ukuran == 0: raise UnggahanDitolak("File kosong.")
+        if b"%%EOF" not in ekor and b"startxref" not in ekor:
+            raise UnggahanDitolak("PDF terpotong (trailer tidak ditemukan).")
+        jumlah_halaman = validasi_struktur_pdf(path_tujuan)
+    except Exception:
+        if path_tujuan.exists():
+            os.remove(path_tujuan)
+        raise
+
+    return {"path": path_tujuan, "ukuran_byte": ukuran, "sha256": hasher.hexdigest(), "jumlah_halaman": jumlah_halaman}
@@ -6,6 +6,8 @@ from typing import Dict, List, Any, Callable
 from PIL import Image
 import pytesseract
 
+from pencocokan_fuzzy import cari_kandidat_fuzzy, tambah_ke_indeks_fuzzy
+
 def bersihkan_teks(teks_mentah: str) -> str:
     if not teks_mentah: return ""
     teks_bersih = re.sub(r'\s+', ' ', teks_mentah.strip())
@@ -13,14 +15,17 @@ def bersihkan_teks(teks_mentah: str) -> str:
     teks_bersih = re.sub(r'(\d{1,2})/(\d{1,2})/(\d{4})', r'\1-\2-\3', teks_bersih)
     return teks_bersih.strip()
 
+def ekstrak_metadata_dari_gambar(img: Image.Image) -> str:
+    img_gray = img.convert('L')
+    img_processed = img_gray.point(lambda x: 0 if x < 128 else 255, '1')
+    config_ocr = '--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz .,:-/|°'
+    teks_mentah = pytesseract.image_to_string(img_processed, config=config_ocr)
+    return bersihkan_teks(teks_mentah)
+
 def ekstrak_metadata_gambar(path_gambar: str) -> str:
     try:
         with Image.open(path_gambar) as img:
-            img_gray = img.convert('L')
-            img_processed = img_gray.point(lambda x: 0 if x < 128 else 255, '1')
-            config_ocr = '--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz .,:-/|°'
-            teks_mentah = pytesseract.image_to_string(img_processed, config=config_ocr)
-            return bersihkan_teks(teks_mentah)
+            return ekstrak_metadata_dari_gambar(img)
     except FileNotFoundError:
         raise FileNotFoundError(f"File gambar tidak ditemukan: {path_gambar}")
     except Exception as e:
@@ -31,7 +36,9 @@ def proses_validasi_dengan_petunjuk(
     indeks_master: Dict[str, Any], 
     nama_proyek: str, 
     path_sesi: str,
-    progress_callback: Callable[[int, int], None] = None
+    progress_callback: Callable[[int, int], None] = None,
+    indeks_fuzzy: Dict[str, Any] = None,
+    ambang_jarak_fuzzy: int = 2
 ) -> Dict[str, Any]:
     detail_duplikat, error_log = [], []
     jumlah_berhasil_diproses, file_unik_baru = 0, 0
@@ -49,14 +56,25 @@ def proses_validasi_dengan_petunjuk(
             if not metadata_teks or len(metadata_teks.strip()) < 5:
                 jumlah_berhasil_diproses += 1; continue
             
+            # Kunci persis dicek dulu; jika gagal, cari kunci yang hanya beda beberapa karakter salah baca OCR
+            kunci_cocok, jenis_kecocokan, jarak = None, None, 0
             if metadata_teks in indeks_master:
+                kunci_cocok, jenis_kecocokan = metadata_teks, "exact"
+            elif indeks_fuzzy is not None:
+                kandidat = cari_kandidat_fuzzy(indeks_fuzzy, metadata_teks, ambang_jarak_fuzzy, maks_hasil=1)
+                if kandidat:
+                    (kunci_cocok, jarak), jenis_kecocokan = kandidat[0], "fuzzy"
+
+            if kunci_cocok is not None:
                 path_relatif_duplikat = os.path.relpath(path_gambar_input, path_sesi)
-                duplikat_info = { "duplikat_ditemukan": path_relatif_duplikat.replace("\\", "/"), "duplikat_dari_petunjuk": indeks_master[metadata_teks] }
+                duplikat_info = { "duplikat_ditemukan": path_relatif_duplikat.replace("\\", "/"), "duplikat_dari_petunjuk": indeks_master[kunci_cocok], "jenis_kecocokan": jenis_kecocokan, "jarak_edit": jarak, "metadata_teks": metadata_teks, "metadata_cocok": kunci_cocok }
                 detail_duplikat.append(duplikat_info)
             else:
                 path_relatif_file = os.path.relpath(path_gambar_input, path_sesi)
                 petunjuk_baru = { "sesi_asli": os.path.basename(path_sesi), "proyek_asli": nama_proyek, "path_relatif_di_sesi": path_relatif_file.replace("\\", "/") }
                 indeks_master[metadata_teks] = petunjuk_baru
+                if indeks_fuzzy is not None:
+                    tambah_ke_indeks_fuzzy(indeks_fuzzy, metadata_teks)
                 file_unik_baru += 1
             
             jumlah_berhasil_diproses += 1
@@ -1,53 +1,177 @@
 # backend/validasi_konten.py
-# Versi dengan metode pencarian "tanpa spasi" untuk mengatasi tokenization
+# Versi dengan metode pencarian "tanpa spasi" untuk mengatasi tokenization,
+# aturan per jenis dokumen, dan deteksi halaman awal setiap bagian.
 
 import re
-from typing import List, Dict, Any
+from bisect import bisect_right
+from typing import List, Dict, Any, Tuple
 
-def cek_kelengkapan_dokumen(laporan_kontekstual: List[Dict[str, Any]], aturan_kelengkapan: Dict[str, List[str]]) -> Dict[str, Any]:
+# Karakter yang tidak pernah muncul setelah normalisasi, sehingga frasa tidak bisa cocok melewati batas halaman
+PEMISAH_HALAMAN = "|"
+# Frasa dianggap judul bagian jika muncul di awal halaman (dalam sekian karakter ter-normalisasi pertama)
+PANJANG_AREA_JUDUL = 120
+# Halaman yang memuat frasa sebanyak ini bagian berbeda dianggap halaman daftar (checklist/daftar isi)
+AMBANG_HALAMAN_DAFTAR = 3
+
+def normalisasi_teks(teks: str) -> str:
+    # Normalisasi teks ke huruf kecil dan hapus SEMUA spasi dan karakter non-alfanumerik
+    return re.sub(r'[^a-z0-9]', '', teks.lower())
+
+def bangun_indeks_halaman(laporan_kontekstual: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
-    Memvalidasi kelengkapan dokumen berdasarkan keberadaan frasa wajib
-    menggunakan metode pencarian 'tanpa spasi' untuk mengatasi tokenization.
+    Membangun indeks teks ter-normalisasi per halaman satu kali per dokumen. Teks semua halaman
+    disambung menjadi satu string (dipisah PEMISAH_HALAMAN) dengan tabel offset, sehingga posisi
+    kecocokan frasa bisa dipetakan balik ke nomor halaman dengan bisect. Hasil pencarian di-cache.
     """
-    
-    frasa_wajib = aturan_kelengkapan.get('frasa_wajib', [])
-    if not frasa_wajib:
-        return {"status": "DILEWATI", "message": "Tidak ada aturan frasa wajib yang didefinisikan."}
-
-    # Gabungkan semua token dari semua halaman menjadi satu string teks besar
-    teks_dokumen_lengkap = ""
+    potongan_teks, offset_halaman, nomor_halaman = [], [], []
+    panjang = 0
     for halaman in laporan_kontekstual:
         analisis_halaman = halaman.get('analisis', {})
         hasil_analisis = analisis_halaman.get('hasil_analisis_kontekstual', [])
+        token_halaman = []
         for item in hasil_analisis:
-            # Menggunakan 'token' yang sudah di-lowercase dari model jika ada, atau handle token dari tokenizer
-            # Untuk LayoutLMV3, token biasanya sudah bersih
             token = item.get('token', '')
             # Menghilangkan karakter khusus awal kata dari beberapa tokenizer (seperti ' ')
             if token.startswith(' '):
                 token = token[1:]
-            teks_dokumen_lengkap += token
+            token_halaman.append(token)
+        teks_normal = normalisasi_teks("".join(token_halaman))
+        offset_halaman.append(panjang)
+        nomor_halaman.append(halaman.get('halaman', len(nomor_halaman) + 1))
+        potongan_teks.append(teks_normal)
+        panjang += len(teks_normal) + len(PEMISAH_HALAMAN)
 
-    # --- PERBAIKAN LOGIKA DI SINI ---
-    # Normalisasi teks ke huruf kecil dan hapus SEMUA spasi dan karakter non-alfanumerik
-    teks_dokumen_normal = re.sub(r'[^a-z0-9]', '', teks_dokumen_lengkap.lower())
+    return {"teks": PEMISAH_HALAMAN.join(potongan_teks), "offset_halaman": offset_halaman, "nomor_halaman": nomor_halaman, "cache": {}, "cache_posisi": {}}
+
+def cari_halaman_frasa(indeks_halaman: Dict[str, Any], frasa: str) -> int | None:
+    """Mengembalikan nomor halaman tempat frasa pertama kali muncul, atau None jika tidak ada."""
+    frasa_normal = normalisasi_teks(frasa)
+    cache = indeks_halaman["cache"]
+    if frasa_normal not in cache:
+        posisi = indeks_halaman["teks"].find(frasa_normal) if frasa_normal else -1
+        if posisi < 0:
+            cache[frasa_normal] = None
+        else:
+            cache[frasa_normal] = indeks_halaman["nomor_halaman"][bisect_right(indeks_halaman["offset_halaman"], posisi) - 1]
+    return cache[frasa_normal]
+
+def posisi_frasa_per_halaman(indeks_halaman: Dict[str, Any], frasa: str) -> Dict[int, int]:
+    """Mengembalikan {nomor_halaman: posisi kemunculan pertama frasa di dalam halaman tersebut}."""
+    frasa_normal = normalisasi_teks(frasa)
+    cache = indeks_halaman["cache_posisi"]
+    if frasa_normal not in cache:
+        teks, offset_halaman = indeks_halaman["teks"], indeks_halaman["offset_halaman"]
+        posisi_per_halaman = {}
+        posisi = teks.find(frasa_normal) if frasa_normal else -1
+        while posisi >= 0:
+            indeks = bisect_right(offset_halaman, posisi) - 1
+            posisi_per_halaman[indeks_halaman["nomor_halaman"][indeks]] = posisi - offset_halaman[indeks]
+            # Lompat ke halaman berikutnya; hanya kemunculan pertama per halaman yang dibutuhkan
+            if indeks + 1 >= len(offset_halaman): break
+            posisi = teks.find(frasa_normal, offset_halaman[indeks + 1])
+        cache[frasa_normal] = posisi_per_halaman
+    return cache[frasa_normal]
+
+def tentukan_halaman_mulai_bagian(kemunculan_bagian: Dict[str, Dict[int, Tuple[int, str]]]) -> Dict[str, Tuple[int, str]]:
+    """
+    Halaman awal bagian adalah halaman pertama tempat frasanya muncul sebagai judul (di awal halaman).
+    Halaman daftar (checklist/daftar isi) menyebut banyak nama bagian sekaligus, sehingga di halaman
+    seperti itu hanya bagian yang judulnya paling awal (judul halaman itu sendiri) yang dihitung.
+    Jika frasa tidak pernah muncul sebagai judul, dipakai kemunculan pertama di luar halaman daftar.
+    """
+    bagian_per_halaman = {}
+    for nama, kemunculan in kemunculan_bagian.items():
+        for halaman, (posisi, _) in kemunculan.items():
+            bagian_per_halaman.setdefault(halaman, []).append((posisi, nama))
+    pemilik_halaman_daftar = {halaman: min(daftar)[1] for halaman, daftar in bagian_per_halaman.items() if len(daftar) >= AMBANG_HALAMAN_DAFTAR}
+
+    halaman_mulai = {}
+    for nama, kemunculan in kemunculan_bagian.items():
+        if not kemunculan: continue
+        sebagai_judul = [h for h, (posisi, _) in kemunculan.items() if posisi < PANJANG_AREA_JUDUL and pemilik_halaman_daftar.get(h, nama) == nama]
+        di_luar_daftar = [h for h in kemunculan if h not in pemilik_halaman_daftar]
+        halaman = min(sebagai_judul or di_luar_daftar or kemunculan)
+        halaman_mulai[nama] = (halaman, kemunculan[halaman][1])
+    return halaman_mulai
+
+def _aturan_per_jenis(aturan_kelengkapan: Dict[str, Any]) -> Dict[str, Any]:
+    """Format lama (hanya 'frasa_wajib') diperlakukan sebagai satu jenis dokumen dengan satu bagian per frasa."""
+    if 'jenis_dokumen' in aturan_kelengkapan:
+        return aturan_kelengkapan['jenis_dokumen']
+    frasa_wajib = aturan_kelengkapan.get('frasa_wajib', [])
+    return {"umum": {"bagian": [{"nama": frasa, "frasa": [frasa]} for frasa in frasa_wajib]}} if frasa_wajib else {}
+
+def deteksi_jenis_dokumen(indeks_halaman: Dict[str, Any], aturan_per_jenis: Dict[str, Any], jenis_default: str | None = None) -> str:
+    """Memilih jenis dokumen dengan jumlah frasa penanda terbanyak yang ditemukan."""
+    skor_terbaik, jenis_terpilih = 0, jenis_default or next(iter(aturan_per_jenis))
+    for jenis, aturan_jenis in aturan_per_jenis.items():
+        skor = sum(1 for frasa in aturan_jenis.get('penanda', []) if cari_halaman_frasa(indeks_halaman, frasa) is not None)
+        if skor > skor_terbaik:
+            skor_terbaik, jenis_terpilih = skor, jenis
+    return jenis_terpilih
+
+def cek_kelengkapan_dokumen(laporan_kontekstual: List[Dict[str, Any]], aturan_kelengkapan: Dict[str, Any], jenis_dokumen: str | None = None) -> Dict[str, Any]:
+    """
+    Memvalidasi kelengkapan dokumen berdasarkan keberadaan frasa setiap bagian
+    menggunakan metode pencarian 'tanpa spasi' untuk mengatasi tokenization,
+    lalu memeriksa urutan halaman awal bagian sesuai 'urutan_bagian' jenis dokumen.
+    """
+    aturan_per_jenis = _aturan_per_jenis(aturan_kelengkapan)
+    if not aturan_per_jenis:
+        return {"status": "DILEWATI", "message": "Tidak ada aturan frasa wajib yang didefinisikan.", "versi_aturan": aturan_kelengkapan.get('versi')}
+
+    indeks_halaman = bangun_indeks_halaman(laporan_kontekstual)
+    if jenis_dokumen is None:
+        jenis_dokumen = deteksi_jenis_dokumen(indeks_halaman, aturan_per_jenis, aturan_kelengkapan.get('jenis_default'))
+    if jenis_dokumen not in aturan_per_jenis:
+        raise ValueError(f"Jenis dokumen '{jenis_dokumen}' tidak ada dalam aturan versi {aturan_kelengkapan.get('versi')}.")
+    aturan_jenis = aturan_per_jenis[jenis_dokumen]
+
+    # Bagian dianggap ada jika salah satu frasanya ditemukan di halaman mana pun
+    kemunculan_bagian = {}
+    for bagian in aturan_jenis.get('bagian', []):
+        kemunculan = kemunculan_bagian.setdefault(bagian['nama'], {})
+        for frasa in bagian['frasa']:
+            for halaman, posisi in posisi_frasa_per_halaman(indeks_halaman, frasa).items():
+                if halaman not in kemunculan or posisi < kemunculan[halaman][0]:
+                    kemunculan[halaman] = (posisi, frasa)
+    halaman_mulai_per_bagian = tentukan_halaman_mulai_bagian(kemunculan_bagian)
 
-    frasa_ditemukan = []
-    frasa_tidak_ditemukan = []
+    hasil_bagian, frasa_ditemukan, frasa_tidak_ditemukan = [], [], []
+    halaman_mulai_bagian = {}
+    for bagian in aturan_jenis.get('bagian', []):
+        halaman_mulai, frasa_cocok = halaman_mulai_per_bagian.get(bagian['nama'], (None, None))
+        hasil_bagian.append({"nama": bagian['nama'], "ditemukan": halaman_mulai is not None, "halaman_mulai": halaman_mulai, "frasa_cocok": frasa_cocok})
+        if halaman_mulai is not None:
+            halaman_mulai_bagian[bagian['nama']] = halaman_mulai
+            frasa_ditemukan.append(bagian['nama'])
+        elif bagian.get('wajib', True):
+            frasa_tidak_ditemukan.append(bagian['nama'])
 
-    for frasa in frasa_wajib:
-        # Normalisasi frasa yang dicari dengan cara yang sama
-        frasa_normal = re.sub(r'[^a-z0-9]', '', frasa.lower())
-        
-        if frasa_normal in teks_dokumen_normal:
-            frasa_ditemukan.append(frasa)
+    pelanggaran_urutan = []
+    bagian_sebelumnya = None
+    for nama_bagian in aturan_jenis.get('urutan_bagian', []):
+        if nama_bagian not in halaman_mulai_bagian: continue
+        if bagian_sebelumnya and halaman_mulai_bagian[nama_bagian] < halaman_mulai_bagian[bagian_sebelumnya]:
+            pelanggaran_urutan.append({
+                "bagian": nama_bagian,
+                "halaman_mulai": halaman_mulai_bagian[nama_bagian],
+                "seharusnya_setelah": bagian_sebelumnya,
+                "halaman_bagian_sebelumnya": halaman_mulai_bagian[bagian_sebelumnya]
+            })
         else:
-            frasa_tidak_ditemukan.append(frasa)
+            bagian_sebelumnya = nama_bagian
 
-    status = "LENGKAP" if not frasa_tidak_ditemukan else "TIDAK LENGKAP"
+    if frasa_tidak_ditemukan: status = "TIDAK LENGKAP"
+    elif pelanggaran_urutan: status = "URUTAN TIDAK SESUAI"
+    else: status = "LENGKAP"
 
     return {
         "status": status,
+        "jenis_dokumen": jenis_dokumen,
         "frasa_ditemukan": frasa_ditemukan,
-        "frasa_tidak_ditemukan": frasa_tidak_ditemukan
-    }
\ No newline at end of file
+        "frasa_tidak_ditemukan": frasa_tidak_ditemukan,
+        "bagian": hasil_bagian,
+        "pelanggaran_urutan": pelanggaran_urutan,
+        "versi_aturan": aturan_kelengkapan.get('versi')
+    }
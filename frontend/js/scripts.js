@@ -8,6 +8,7 @@ const messageDiv = document.getElementById("message");
 const progressContainer = document.getElementById("progressContainer");
 const progressBar = document.getElementById("progressBar");
 const progressText = document.getElementById("progressText");
+const progressStage = document.getElementById("progressStage");
 
 // Pengaturan URL API Dinamis
 const IS_LOCAL = window.location.hostname === 'localhost' || window.location.hostname === '127.0.0.1';
@@ -35,7 +36,38 @@ function validateFile(files) {
     return null;
 }
 
-function uploadFiles(files) {
+function setProgress(percent, stageText) {
+    progressBar.style.width = percent + "%";
+    progressText.textContent = percent + "%";
+    if (stageText !== undefined) progressStage.textContent = stageText;
+}
+
+// Membuat sesi lebih dulu agar stream progres bisa dibuka sebelum unggahan dimulai
+async function createSession() {
+    const response = await fetch(`${API_URL}/sesi`, { method: "POST" });
+    if (!response.ok) throw { detail: "Gagal membuat sesi baru." };
+    return (await response.json()).id_sesi;
+}
+
+// Mendengarkan event progres (SSE) dari backend: tahap, proyek, current/total, waktu tahap
+function listenProgress(sessionId) {
+    const source = new EventSource(`${API_URL}/progres/${sessionId}`);
+    source.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.tipe === "progres") {
+            const percent = data.total ? Math.round((data.current / data.total) * 100) : 0;
+            setProgress(percent, `${data.tahap} — ${data.proyek}: ${data.current}/${data.total} (${data.elapsed_tahap_detik}s)`);
+        } else if (data.tipe === "antrean") {
+            setProgress(0, data.message);
+        } else if (data.tipe === "selesai" || data.tipe === "error") {
+            source.close();
+        }
+    };
+    source.onerror = () => source.close();
+    return source;
+}
+
+function uploadFiles(files, sessionId) {
     return new Promise((resolve, reject) => {
         const formData = new FormData();
         // Loop untuk menambahkan semua file ke FormData
@@ -48,8 +80,7 @@ function uploadFiles(files) {
         xhr.upload.addEventListener("progress", (event) => {
             if (event.lengthComputable) {
                 const percentComplete = Math.round((event.loaded / event.total) * 100);
-                progressBar.style.width = percentComplete + "%";
-                progressText.textContent = percentComplete + "%";
+                setProgress(percentComplete, percentComplete < 100 ? "Mengunggah file..." : "Unggahan selesai, memvalidasi file...");
             }
         });
 
@@ -71,7 +102,7 @@ function uploadFiles(files) {
         });
 
         // Endpoint tetap sama
-        xhr.open("POST", `${API_URL}/upload_and_validate`);
+        xhr.open("POST", `${API_URL}/upload_and_validate?id_sesi=${encodeURIComponent(sessionId)}`);
         xhr.send(formData);
     });
 }
@@ -90,33 +121,44 @@ uploadForm.addEventListener("submit", async (e) => {
     uploadButton.textContent = "Memproses...";
     hideMessage();
     progressContainer.style.display = "flex";
-    progressBar.style.width = "0%";
-    progressText.textContent = "0%";
+    setProgress(0, "");
 
+    let progressSource = null;
     try {
-        const result = await uploadFiles(files); // Panggil fungsi plural
+        const sessionId = await createSession();
+        progressSource = listenProgress(sessionId);
+        const result = await uploadFiles(files, sessionId); // Panggil fungsi plural
+        setProgress(100, "Selesai.");
         
         // Menampilkan ringkasan dari laporan sesi
         const totalProyek = result.proyek_yang_diproses?.length || 0;
         const totalDuplikat = result.total_duplikat_ditemukan || 0;
+        const fileDitolak = result.file_ditolak || [];
 
         let successMessage = `
             <strong>Sesi Selesai (ID: ${result.id_sesi})</strong><br>
             - Total Laporan Diproses: ${totalProyek}<br>
             - Total Foto Duplikat Ditemukan: <strong>${totalDuplikat}</strong><br>
-            - Laporan detail tersimpan di server.
+            ${fileDitolak.map(f => `- Ditolak: ${f.nama_file} (${f.alasan})<br>`).join("")}
+            - Laporan detail tersimpan di server${totalDuplikat > 0 ? ` (<a href="${API_URL}/sesi/${encodeURIComponent(result.id_sesi)}/duplikat" target="_blank">lihat detail duplikat</a>)` : ""}.
         `;
         showMessage(successMessage, "success");
         uploadForm.reset();
 
     } catch (error) {
-        const errorMessage = `Gagal memproses file: ${error.detail || 'Error tidak diketahui.'}`;
+        // detail bisa berupa string atau objek { message, file_ditolak } saat semua file ditolak
+        const detail = error.detail?.message
+            ? `${error.detail.message}<br>${(error.detail.file_ditolak || []).map(f => `- ${f.nama_file}: ${f.alasan}`).join("<br>")}`
+            : error.detail;
+        const errorMessage = `Gagal memproses file: ${detail || 'Error tidak diketahui.'}`;
         showMessage(errorMessage, "error");
     } finally {
+        if (progressSource) progressSource.close();
         uploadButton.disabled = false;
         uploadButton.textContent = "Unggah dan Validasi";
         setTimeout(() => {
             progressContainer.style.display = "none";
+            progressStage.textContent = "";
         }, 3000);
     }
 });
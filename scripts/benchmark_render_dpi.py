@@ -0,0 +1,89 @@
+# scripts/benchmark_render_dpi.py
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import statistics
+from collections import Counter
+import fitz
+from PIL import Image
+
+# Menambahkan path root proyek agar bisa impor dari folder backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.konteks_extractor import load_model, analisis_halaman_dengan_layoutlmv3
+from backend.render_halaman import render_halaman_adaptif
+
+def render_dpi_tetap(page, dpi):
+    pix = page.get_pixmap(dpi=dpi)
+    return Image.frombytes("RGB", [pix.width, pix.height], pix.samples), {"dpi": dpi}
+
+def f1_token(prediksi: list, referensi: list) -> float:
+    """F1 multiset pasangan (token, label) terhadap hasil render referensi."""
+    cocok = sum((Counter(prediksi) & Counter(referensi)).values())
+    if not prediksi or not referensi: return 1.0 if prediksi == referensi else 0.0
+    presisi, recall = cocok / len(prediksi), cocok / len(referensi)
+    return 2 * presisi * recall / (presisi + recall) if presisi + recall else 0.0
+
+def jalankan_mode(page, mode):
+    mulai = time.perf_counter()
+    image, info = render_halaman_adaptif(page) if mode == "adaptif" else render_dpi_tetap(page, int(mode))
+    waktu_render = time.perf_counter() - mulai
+
+    mulai = time.perf_counter()
+    hasil = analisis_halaman_dengan_layoutlmv3(image)
+    waktu_analisis = time.perf_counter() - mulai
+
+    token = [(t["token"], t["label"]) for t in hasil["hasil_analisis_kontekstual"]]
+    return {"dpi": info["dpi"], "piksel": image.width * image.height, "waktu_render": waktu_render, "waktu_analisis": waktu_analisis, "token": token}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark akurasi/latensi render DPI tetap vs adaptif untuk analisis LayoutLMv3.")
+    parser.add_argument("--pdf_dir", required=True, help="Direktori berisi PDF sampel.")
+    parser.add_argument("--dpi", nargs="+", default=["100", "150", "200"], help="DPI tetap yang dibandingkan.")
+    parser.add_argument("--dpi_referensi", type=int, default=300, help="DPI render referensi untuk menghitung akurasi.")
+    parser.add_argument("--maks_halaman", type=int, default=50, help="Jumlah halaman sampel maksimum.")
+    parser.add_argument("--output", default="benchmark_render_dpi.json", help="File JSON hasil benchmark.")
+    args = parser.parse_args()
+
+    print("Memuat model AI...")
+    load_model()
+
+    daftar_mode = args.dpi + ["adaptif"]
+    hasil_per_mode = {mode: [] for mode in daftar_mode}
+    jumlah_halaman = 0
+
+    for path_pdf in sorted(glob.glob(os.path.join(args.pdf_dir, "*.pdf"))):
+        doc = fitz.open(path_pdf)
+        for page in doc:
+            if jumlah_halaman >= args.maks_halaman: break
+            jumlah_halaman += 1
+            print(f"-> {os.path.basename(path_pdf)} halaman {page.number + 1}")
+            referensi = jalankan_mode(page, str(args.dpi_referensi))["token"]
+            for mode in daftar_mode:
+                hasil = jalankan_mode(page, mode)
+                hasil["f1_vs_referensi"] = f1_token(hasil.pop("token"), referensi)
+                hasil_per_mode[mode].append(hasil)
+        doc.close()
+
+    ringkasan = {}
+    for mode, daftar in hasil_per_mode.items():
+        if not daftar: continue
+        ringkasan[mode] = {
+            "rata_rata_dpi": statistics.mean(h["dpi"] for h in daftar),
+            "rata_rata_megapiksel": statistics.mean(h["piksel"] for h in daftar) / 1e6,
+            "rata_rata_waktu_render": statistics.mean(h["waktu_render"] for h in daftar),
+            "rata_rata_waktu_analisis": statistics.mean(h["waktu_analisis"] for h in daftar),
+            "rata_rata_f1_vs_referensi": statistics.mean(h["f1_vs_referensi"] for h in daftar),
+        }
+        r = ringkasan[mode]
+        print(f"{mode:>8} | dpi {r['rata_rata_dpi']:6.1f} | {r['rata_rata_megapiksel']:5.2f} MP | render {r['rata_rata_waktu_render']:.3f}s | analisis {r['rata_rata_waktu_analisis']:.3f}s | F1 {r['rata_rata_f1_vs_referensi']:.3f}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"jumlah_halaman": jumlah_halaman, "dpi_referensi": args.dpi_referensi, "ringkasan": ringkasan, "detail": hasil_per_mode}, f, indent=4, ensure_ascii=False)
+    print(f"\nHasil benchmark disimpan di: {args.output}")
+
+if __name__ == "__main__":
+    main()
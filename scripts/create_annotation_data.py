@@ -1,102 +1,150 @@
 # create_annotation_data.py
+import os
 import json
+import glob
 import argparse
+import multiprocessing
+from collections import deque, Counter
+from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor
 import fitz
-from PIL import Image
 import re
 
-from backend.konteks_extractor import load_model, analisis_halaman_dengan_layoutlmv3
-
-# Ganti fungsi ini di create_annotation_data.py
+# Kode model (torch/transformers) diimpor di dalam fungsi, bukan di sini: worker render memakai
+# start method spawn yang mengimpor ulang modul ini, dan worker cukup memuat fitz + render_halaman
+from backend.render_halaman import render_halaman_adaptif
+
+def _tebak_label(word_text: str) -> str:
+    if ":" in word_text: return "KEY"
+    if re.fullmatch(r'[\d,.-]+', word_text) or re.search(r'\d{1,2}\s+\w+\s+\d{4}', word_text, re.IGNORECASE): return "VALUE"
+    return "OTHER"
+
+def _buat_kata(word_tokens: list) -> dict | None:
+    word_text = "".join(t['token'] for t in word_tokens).replace(' ', ' ').strip()
+    if not word_text:
+        return None
+    min_x0 = min(t['box'][0] for t in word_tokens)
+    min_y0 = min(t['box'][1] for t in word_tokens)
+    max_x1 = max(t['box'][2] for t in word_tokens)
+    max_y1 = max(t['box'][3] for t in word_tokens)
+    return {"word": word_text, "box": [min_x0, min_y0, max_x1, max_y1], "label": _tebak_label(word_text)}
 
 def merge_tokens_to_words(tokens: list, y_tolerance: int = 5, x_tolerance_ratio: float = 0.5) -> list:
     """
-    Menggabungkan token yang berdekatan menjadi kata utuh dengan metode sorting yang disempurnakan.
+    Menggabungkan token yang berdekatan menjadi kata utuh. Token diurutkan satu kali lalu
+    dikelompokkan per baris; kata tidak pernah disambung melewati batas baris.
     """
     if not tokens:
         return []
 
-    # --- PERBAIKAN UTAMA ADA DI SINI ---
-    # Kita tidak mengelompokkan per baris secara manual, tapi menyempurnakan kriteria sorting.
     # `round(t['box'][1] / 10)` akan menganggap token dalam rentang 10 piksel vertikal sebagai satu baris.
-    tokens.sort(key=lambda t: (round(t['box'][1] / 10), t['box'][0]))
+    kunci_baris = lambda t: round(t['box'][1] / 10)
+    tokens_urut = sorted(tokens, key=lambda t: (kunci_baris(t), t['box'][0]))
 
     words = []
-    current_word_tokens = []
+    for _, tokens_baris in groupby(tokens_urut, key=kunci_baris):
+        current_word_tokens = []
+        for token in tokens_baris:
+            token_text = token['token'].replace(' ', ' ')
 
-    if not tokens:
-        return []
+            if current_word_tokens:
+                last_token = current_word_tokens[-1]
 
-    for token in sorted(tokens, key=lambda t: (round(t['box'][1] / 10), t['box'][0])):
-        token_text = token['token'].replace(' ', ' ')
-        
-        if not current_word_tokens:
-            current_word_tokens.append(token)
-            continue
+                # Cek kedekatan vertikal di dalam baris yang sama
+                is_same_line = abs(last_token['box'][1] - token['box'][1]) < y_tolerance
+
+                # Cek kedekatan horizontal untuk digabung menjadi satu kata
+                last_token_height = last_token['box'][3] - last_token['box'][1]
+                x_tolerance = last_token_height * x_tolerance_ratio if last_token_height > 0 else 5
+                is_adjacent = (token['box'][0] - last_token['box'][2]) < x_tolerance
+
+                if is_same_line and is_adjacent and not token_text.startswith(' '):
+                    current_word_tokens.append(token)
+                    continue
+
+                # Kata sebelumnya selesai, simpan
+                word = _buat_kata(current_word_tokens)
+                if word: words.append(word)
 
-        last_token = current_word_tokens[-1]
-        
-        # Cek kedekatan di baris yang sama
-        is_same_line = abs(last_token['box'][1] - token['box'][1]) < y_tolerance
-
-        # Cek kedekatan horizontal untuk digabung menjadi satu kata
-        last_token_height = last_token['box'][3] - last_token['box'][1]
-        x_tolerance = last_token_height * x_tolerance_ratio if last_token_height > 0 else 5
-        is_adjacent = (token['box'][0] - last_token['box'][2]) < x_tolerance
-        
-        if is_same_line and is_adjacent and not token_text.startswith(' '):
-            current_word_tokens.append(token)
-        else:
-            # Kata sebelumnya selesai, simpan
-            word_text = "".join(t['token'] for t in current_word_tokens).replace(' ', ' ').strip()
-            if word_text:
-                min_x0 = min(t['box'][0] for t in current_word_tokens)
-                min_y0 = min(t['box'][1] for t in current_word_tokens)
-                max_x1 = max(t['box'][2] for t in current_word_tokens)
-                max_y1 = max(t['box'][3] for t in current_word_tokens)
-                
-                guess = "OTHER"
-                if ":" in word_text: guess = "KEY"
-                elif re.fullmatch(r'[\d,.-]+', word_text) or re.search(r'\d{1,2}\s+\w+\s+\d{4}', word_text, re.IGNORECASE): guess = "VALUE"
-                
-                words.append({"word": word_text, "box": [min_x0, min_y0, max_x1, max_y1], "label": guess})
-            
             current_word_tokens = [token]
 
-    # Proses kata terakhir
-    if current_word_tokens:
-        word_text = "".join(t['token'] for t in current_word_tokens).replace(' ', ' ').strip()
-        if word_text:
-            min_x0 = min(t['box'][0] for t in current_word_tokens)
-            min_y0 = min(t['box'][1] for t in current_word_tokens)
-            max_x1 = max(t['box'][2] for t in current_word_tokens)
-            max_y1 = max(t['box'][3] for t in current_word_tokens)
-            guess = "OTHER"
-            if ":" in word_text: guess = "KEY"
-            elif re.fullmatch(r'[\d,.-]+', word_text) or re.search(r'\d{1,2}\s+\w+\s+\d{4}', word_text, re.IGNORECASE): guess = "VALUE"
-            words.append({"word": word_text, "box": [min_x0, min_y0, max_x1, max_y1], "label": guess})
+        # Proses kata terakhir di baris ini
+        word = _buat_kata(current_word_tokens)
+        if word: words.append(word)
 
     return words
 
-def main():
-    parser = argparse.ArgumentParser(description="Mengekstrak dan menyiapkan data anotasi dari satu halaman PDF.")
-    parser.add_argument("--pdf", required=True, help="Path ke file PDF sumber.")
-    parser.add_argument("--halaman", required=True, type=int, help="Nomor halaman yang akan diproses (dimulai dari 1).")
-    parser.add_argument("--output", required=True, help="Path untuk menyimpan file JSON yang siap dianotasi (level-kata).")
-    args = parser.parse_args()
+def parse_rentang_halaman(teks_rentang: str | None, total_halaman: int) -> list:
+    """Mengubah '1,3-5,9' menjadi [1, 3, 4, 5, 9]. None berarti semua halaman."""
+    if not teks_rentang:
+        return list(range(1, total_halaman + 1))
+    halaman = set()
+    for bagian in teks_rentang.split(","):
+        bagian = bagian.strip()
+        if "-" in bagian:
+            awal, akhir = bagian.split("-", 1)
+            halaman.update(range(int(awal), int(akhir) + 1))
+        elif bagian:
+            halaman.add(int(bagian))
+    return sorted(h for h in halaman if 1 <= h <= total_halaman)
+
+def kumpulkan_pdf(daftar_input: list) -> dict:
+    """
+    Mengembalikan {path_pdf: nama_dasar_output}. Untuk PDF di dalam direktori input, nama dasar diambil
+    dari path relatif terhadap direktori itu ("sub/a.pdf" -> "sub__a") agar PDF bernama sama di
+    subfolder berbeda tidak saling menimpa hasil anotasi.
+    """
+    daftar_pdf = {}
+    for path_input in daftar_input:
+        if os.path.isdir(path_input):
+            for path_pdf in sorted(glob.glob(os.path.join(path_input, "**", "*.pdf"), recursive=True)):
+                path_relatif = os.path.splitext(os.path.relpath(path_pdf, path_input))[0]
+                daftar_pdf.setdefault(path_pdf, path_relatif.replace(os.sep, "__"))
+        else:
+            daftar_pdf.setdefault(path_input, os.path.splitext(os.path.basename(path_input))[0])
+    return daftar_pdf
 
-    # 1. Muat Model
-    print("Memuat model AI...")
-    load_model()
+def render_halaman_pdf(path_pdf: str, nomor_halaman: int):
+    # Dijalankan di proses worker
+    doc = fitz.open(path_pdf)
+    try:
+        page = doc.load_page(nomor_halaman - 1)
+        # DPI adaptif (maks. 300 untuk kualitas anotasi), dibatasi total piksel untuk halaman besar
+        image, info_render = render_halaman_adaptif(page, dpi_bawaan=300, dpi_maks=300)
+    finally:
+        doc.close()
+    return path_pdf, nomor_halaman, image, info_render
+
+def render_paralel(daftar_tugas: list, workers: int, ukuran_antrian: int):
+    """Merender halaman di process pool dengan jumlah halaman 'di udara' dibatasi agar memori tetap terkendali."""
+    konteks = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=konteks) as executor:
+        iterator_tugas = iter(daftar_tugas)
+        antrian = deque()
+        for tugas in iterator_tugas:
+            antrian.append((tugas, executor.submit(render_halaman_pdf, *tugas)))
+            if len(antrian) >= ukuran_antrian: break
+        while antrian:
+            tugas, future = antrian.popleft()
+            tugas_berikutnya = next(iterator_tugas, None)
+            if tugas_berikutnya is not None:
+                antrian.append((tugas_berikutnya, executor.submit(render_halaman_pdf, *tugas_berikutnya)))
+            try:
+                yield future.result()
+            except Exception as e:
+                print(f"[ERROR] Gagal merender {tugas[0]} halaman {tugas[1]}: {e}")
+
+def simpan_kata(words_for_annotation: list, output_path: str):
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(words_for_annotation, f, indent=4, ensure_ascii=False)
 
+def proses_satu_halaman(args):
+    from backend.konteks_extractor import analisis_halaman_dengan_layoutlmv3
     # 2. Render PDF ke Gambar
-    print(f"Membuka PDF '{args.pdf}' dan merender halaman {args.halaman}...")
+    print(f"Membuka PDF '{args.pdf[0]}' dan merender halaman {args.halaman}...")
     try:
-        doc = fitz.open(args.pdf)
-        page = doc.load_page(args.halaman - 1)
-        pix = page.get_pixmap(dpi=300) # Tingkatkan DPI untuk kualitas lebih baik
-        image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        doc.close()
+        _, _, image, info_render = render_halaman_pdf(args.pdf[0], int(args.halaman))
+        print(f"Halaman dirender pada {info_render['dpi']} dpi ({info_render['alasan']}).")
     except Exception as e:
         print(f"[ERROR] Gagal membuka atau merender PDF: {e}")
         return
@@ -112,10 +160,66 @@ def main():
 
     # 5. Simpan Hasil
     print(f"Menyimpan {len(words_for_annotation)} kata ke file output: {args.output}")
-    with open(args.output, 'w', encoding='utf-8') as f:
-        json.dump(words_for_annotation, f, indent=4, ensure_ascii=False)
-        
+    simpan_kata(words_for_annotation, args.output)
+
+def proses_batch(args):
+    from backend.konteks_extractor import analisis_batch_halaman_dengan_layoutlmv3
+    os.makedirs(args.output, exist_ok=True)
+    nama_dasar_pdf = kumpulkan_pdf(args.pdf)
+    nama_bentrok = sorted(nama for nama, jumlah in Counter(nama_dasar_pdf.values()).items() if jumlah > 1)
+    if nama_bentrok:
+        print(f"[ERROR] Beberapa PDF menghasilkan nama output yang sama: {', '.join(nama_bentrok)}. Ganti nama file atau proses terpisah.")
+        return
+    daftar_tugas = []
+    for path_pdf in nama_dasar_pdf:
+        try:
+            with fitz.open(path_pdf) as doc:
+                total_halaman = len(doc)
+        except Exception as e:
+            print(f"[ERROR] Gagal membuka {path_pdf}: {e}")
+            continue
+        daftar_tugas.extend((path_pdf, h) for h in parse_rentang_halaman(args.halaman, total_halaman))
+    print(f"Total {len(daftar_tugas)} halaman akan diproses dengan {args.workers} worker render.")
+
+    def analisis_dan_simpan(batch):
+        hasil_batch = analisis_batch_halaman_dengan_layoutlmv3([image for _, _, image, _ in batch], ukuran_batch=args.batch_size)
+        for (path_pdf, nomor_halaman, _, _), hasil_analisis in zip(batch, hasil_batch):
+            words_for_annotation = merge_tokens_to_words(hasil_analisis.get("hasil_analisis_kontekstual", []))
+            nama_output = f"{nama_dasar_pdf[path_pdf]}_halaman_{nomor_halaman}.json"
+            simpan_kata(words_for_annotation, os.path.join(args.output, nama_output))
+            print(f"-> {nama_output}: {len(words_for_annotation)} kata")
+
+    batch = []
+    for hasil_render in render_paralel(daftar_tugas, args.workers, args.batch_size * 2):
+        batch.append(hasil_render)
+        if len(batch) == args.batch_size:
+            analisis_dan_simpan(batch)
+            batch = []
+    if batch:
+        analisis_dan_simpan(batch)
+
+def main():
+    parser = argparse.ArgumentParser(description="Mengekstrak dan menyiapkan data anotasi (level-kata) dari halaman PDF.")
+    parser.add_argument("--pdf", required=True, nargs="+", help="Path ke file PDF sumber, atau direktori berisi PDF (mode batch).")
+    parser.add_argument("--halaman", help="Halaman yang diproses (dimulai dari 1), mis. '3' atau '1,4-10'. Default: semua halaman.")
+    parser.add_argument("--output", required=True, help="File JSON output (satu halaman) atau direktori output (mode batch, satu JSON per halaman).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Jumlah proses render paralel (mode batch).")
+    parser.add_argument("--batch_size", type=int, default=8, help="Jumlah halaman/jendela per batch inferensi (mode batch).")
+    args = parser.parse_args()
+
+    mode_satu_halaman = len(args.pdf) == 1 and os.path.isfile(args.pdf[0]) and args.halaman and args.halaman.isdigit() and args.output.endswith(".json")
+
+    # 1. Muat Model (sekali untuk seluruh halaman)
+    print("Memuat model AI...")
+    from backend.konteks_extractor import load_model
+    load_model()
+
+    if mode_satu_halaman:
+        proses_satu_halaman(args)
+    else:
+        proses_batch(args)
+
     print("\nSelesai! File yang siap dianotasi telah dibuat.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
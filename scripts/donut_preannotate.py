@@ -3,6 +3,8 @@ import os
 import json
 import torch
 import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 from transformers import DonutProcessor, VisionEncoderDecoderModel
 import sys
@@ -10,78 +12,167 @@ import sys
 # Menambahkan path root proyek agar bisa impor dari folder lain jika dibutuhkan
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def donut_preannotate(image_path, processor, model, device):
+TASK_PROMPT = "<s_cord-v2>"
+
+def siapkan_gambar(image_path, processor):
+    # Dijalankan di thread worker: decode + resize/normalisasi gambar menjadi pixel_values
     image = Image.open(image_path).convert("RGB")
-    pixel_values = processor(image, return_tensors="pt").pixel_values.to(device)
-    task_prompt = "<s_cord-v2>"
+    return processor(image, return_tensors="pt").pixel_values[0]
+
+def prefetch_gambar(daftar_path, processor, num_workers, ukuran_antrian):
+    """Mirip DataLoader: decode gambar berikutnya di thread worker selagi batch sekarang diproses model."""
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        iterator_path = iter(daftar_path)
+        antrian = deque()
+        for image_path in iterator_path:
+            antrian.append((image_path, executor.submit(siapkan_gambar, image_path, processor)))
+            if len(antrian) >= ukuran_antrian: break
+        while antrian:
+            image_path, future = antrian.popleft()
+            path_berikutnya = next(iterator_path, None)
+            if path_berikutnya is not None:
+                antrian.append((path_berikutnya, executor.submit(siapkan_gambar, path_berikutnya, processor)))
+            try:
+                yield image_path, future.result(), None
+            except Exception as e:
+                yield image_path, None, e
+
+def donut_preannotate_batch(pixel_values, processor, model, device):
+    pixel_values = torch.stack(pixel_values).to(device)
     decoder_input_ids = processor.tokenizer(
-        task_prompt, add_special_tokens=False, return_tensors="pt"
-    ).input_ids.to(device)
-
-    outputs = model.generate(
-        pixel_values,
-        decoder_input_ids=decoder_input_ids,
-        max_length=model.decoder.config.max_position_embeddings,
-        early_stopping=True,
-        pad_token_id=processor.tokenizer.pad_token_id,
-        eos_token_id=processor.tokenizer.eos_token_id,
-        use_cache=True,
-        num_beams=1,
-        bad_words_ids=[[processor.tokenizer.unk_token_id]],
-        return_dict_in_generate=True,
-    )
-
-    sequence = processor.batch_decode(outputs.sequences)[0]
-    sequence = sequence.replace(processor.tokenizer.eos_token, "").replace(processor.tokenizer.pad_token, "")
-    sequence = sequence.strip()
-
-    try:
-        structured_data = processor.token2json(sequence)
-        print(f"    - Berhasil mengekstrak {len(structured_data.keys())} item dari {os.path.basename(image_path)}")
-        return structured_data
-    except Exception as e:
-        print(f"    - [!] Gagal mem-parsing output untuk {os.path.basename(image_path)}: {e}")
-        return {}
+        TASK_PROMPT, add_special_tokens=False, return_tensors="pt"
+    ).input_ids.repeat(len(pixel_values), 1).to(device)
+
+    with torch.inference_mode():
+        outputs = model.generate(
+            pixel_values,
+            decoder_input_ids=decoder_input_ids,
+            max_length=model.decoder.config.max_position_embeddings,
+            early_stopping=True,
+            pad_token_id=processor.tokenizer.pad_token_id,
+            eos_token_id=processor.tokenizer.eos_token_id,
+            use_cache=True,
+            num_beams=1,
+            bad_words_ids=[[processor.tokenizer.unk_token_id]],
+            return_dict_in_generate=True,
+        )
+
+    hasil = []
+    for sequence in processor.batch_decode(outputs.sequences):
+        # Urutan yang selesai lebih awal dipadding oleh generate; buang token pad/eos
+        sequence = sequence.replace(processor.tokenizer.eos_token, "").replace(processor.tokenizer.pad_token, "")
+        sequence = sequence.strip()
+        try:
+            hasil.append(processor.token2json(sequence))
+        except Exception as e:
+            hasil.append(e)
+    return hasil
+
+def donut_preannotate(image_path, processor, model, device):
+    hasil = donut_preannotate_batch([siapkan_gambar(image_path, processor)], processor, model, device)[0]
+    return {} if isinstance(hasil, Exception) else hasil
+
+def baca_file_selesai(output_path):
+    """Membaca output JSONL yang sudah ada untuk melanjutkan dari checkpoint."""
+    selesai = set()
+    if not os.path.exists(output_path):
+        return selesai
+    with open(output_path, 'rb+') as f:
+        data = f.read()
+        # Baris terakhir bisa terpotong jika proses sebelumnya crash saat menulis; buang agar
+        # baris baru yang di-append tidak ikut rusak
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    for baris in data.decode('utf-8').splitlines():
+        try:
+            selesai.add(json.loads(baris)["file_name"])
+        except (json.JSONDecodeError, KeyError):
+            continue
+    return selesai
+
+def tulis_hasil_batch(f_output, batch, hasil_batch):
+    for (filename, _), donut_output in zip(batch, hasil_batch):
+        if isinstance(donut_output, Exception):
+            print(f"    - [!] Gagal mem-parsing output untuk {filename}: {donut_output}")
+            donut_output = {}
+        else:
+            print(f"    - Berhasil mengekstrak {len(donut_output.keys())} item dari {filename}")
+        f_output.write(json.dumps({"file_name": filename, "donut_extraction": donut_output}, ensure_ascii=False) + "\n")
+    f_output.flush()
+
+def ekspor_jsonl_ke_json(jsonl_path, json_path):
+    all_results = []
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for baris in f:
+            try:
+                all_results.append(json.loads(baris))
+            except json.JSONDecodeError:
+                continue
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(all_results, f, indent=4, ensure_ascii=False)
+    return len(all_results)
 
 def main():
     # Menentukan path secara otomatis berdasarkan lokasi skrip
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     DEFAULT_IMAGE_DIR = os.path.join(project_root, "data_preparation", "01_raw_images")
     DEFAULT_OUTPUT_DIR = os.path.join(project_root, "data_preparation", "02_pre_annotations")
-    
+
     parser = argparse.ArgumentParser(description="Pra-anotasi cerdas menggunakan Donut.")
     parser.add_argument("--image_dir", default=DEFAULT_IMAGE_DIR, help=f"Direktori gambar. Default: {DEFAULT_IMAGE_DIR}")
     parser.add_argument("--output_dir", default=DEFAULT_OUTPUT_DIR, help=f"Direktori output. Default: {DEFAULT_OUTPUT_DIR}")
+    parser.add_argument("--batch_size", type=int, default=4, help="Jumlah gambar per panggilan model.generate.")
+    parser.add_argument("--num_workers", type=int, default=min(4, os.cpu_count() or 1), help="Jumlah thread decode gambar.")
+    parser.add_argument("--no_resume", action="store_true", help="Abaikan output lama dan proses ulang semua gambar.")
     args = parser.parse_args()
 
     os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, "donut_preannotations.jsonl")
+    if args.no_resume and os.path.exists(output_path):
+        os.remove(output_path)
 
     print("Memuat model Donut (mungkin butuh beberapa saat saat pertama kali)...")
     device = "cuda" if torch.cuda.is_available() else "cpu"
     print(f"Menggunakan device: {device}")
-    
+
     processor = DonutProcessor.from_pretrained("naver-clova-ix/donut-base-finetuned-cord-v2")
     model = VisionEncoderDecoderModel.from_pretrained("naver-clova-ix/donut-base-finetuned-cord-v2").to(device)
+    model.eval()
 
-    all_results = []
-    image_files = [f for f in os.listdir(args.image_dir) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
-    
-    print(f"\nDitemukan {len(image_files)} gambar. Memulai proses pra-anotasi...")
+    image_files = sorted(f for f in os.listdir(args.image_dir) if f.lower().endswith(('.png', '.jpg', '.jpeg')))
+    sudah_selesai = baca_file_selesai(output_path)
+    sisa_files = [f for f in image_files if f not in sudah_selesai]
 
-    for filename in image_files:
-        image_path = os.path.join(args.image_dir, filename)
-        try:
-            donut_output = donut_preannotate(image_path, processor, model, device)
-            all_results.append({"file_name": filename, "donut_extraction": donut_output})
-        except Exception as e:
-            print(f"  - [!!!] Error fatal saat memproses {filename}: {e}")
-            
-    output_path = os.path.join(args.output_dir, "donut_preannotations.json")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(all_results, f, indent=4, ensure_ascii=False)
+    print(f"\nDitemukan {len(image_files)} gambar, {len(sudah_selesai)} sudah diproses sebelumnya. Memulai proses pra-anotasi {len(sisa_files)} gambar...")
+
+    daftar_path = [os.path.join(args.image_dir, f) for f in sisa_files]
+    with open(output_path, 'a', encoding='utf-8') as f_output:
+        def proses_batch(batch):
+            # Batch yang gagal tidak ditulis, sehingga akan dicoba lagi saat resume
+            try:
+                tulis_hasil_batch(f_output, batch, donut_preannotate_batch([p for _, p in batch], processor, model, device))
+            except Exception as e:
+                print(f"  - [!!!] Error fatal saat memproses batch {[n for n, _ in batch]}: {e}")
+
+        batch = []
+        for image_path, pixel_values, error in prefetch_gambar(daftar_path, processor, args.num_workers, args.batch_size * 2):
+            if error is not None:
+                print(f"  - [!!!] Error fatal saat memuat {os.path.basename(image_path)}: {error}")
+                continue
+            batch.append((os.path.basename(image_path), pixel_values))
+            if len(batch) == args.batch_size:
+                proses_batch(batch)
+                batch = []
+        if batch:
+            proses_batch(batch)
+
+    # Tetap sediakan format JSON lama untuk langkah anotasi berikutnya
+    json_path = os.path.join(args.output_dir, "donut_preannotations.json")
+    jumlah = ekspor_jsonl_ke_json(output_path, json_path)
 
     print("\nPra-anotasi Selesai! ✅")
-    print(f"Hasil ekstraksi teks disimpan di: {output_path}")
+    print(f"Hasil ekstraksi teks ({jumlah} gambar) disimpan di: {output_path} dan {json_path}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
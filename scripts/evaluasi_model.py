@@ -0,0 +1,134 @@
+# scripts/evaluasi_model.py
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+import resource
+import numpy as np
+import torch
+from PIL import Image
+from seqeval.metrics import f1_score, precision_score, recall_score
+
+# Menambahkan path root proyek agar bisa impor dari folder backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend.konteks_extractor as konteks_extractor
+from backend.konteks_extractor import load_model, analisis_halaman_dengan_layoutlmv3
+
+EKSTENSI_GAMBAR = ('.png', '.jpg', '.jpeg', '.bmp')
+
+def kuantisasi_dinamis():
+    # Varian int8 untuk CPU: hanya layer Linear yang dikuantisasi
+    konteks_extractor.MODEL = torch.ao.quantization.quantize_dynamic(konteks_extractor.MODEL, {torch.nn.Linear}, dtype=torch.qint8)
+
+def daftar_file_anotasi(args) -> list:
+    if args.split_meta:
+        # meta.json dari cache dataset train_model.py menyimpan daftar file evaluasi (held-out)
+        with open(args.split_meta, 'r', encoding='utf-8') as f:
+            return json.load(f)["eval_files"]
+    return sorted(glob.glob(args.annotations))
+
+def evaluasi_akurasi(files: list, batch_size: int) -> dict:
+    """Menjalankan anotasi level-kata ke model dengan gambar placeholder (sama seperti saat training) lalu menghitung seqeval."""
+    model, processor = konteks_extractor.MODEL, konteks_extractor.PROCESSOR
+    label2id = model.config.label2id
+    placeholder = processor.image_processor(Image.new("RGB", (1000, 1000)), apply_ocr=False, return_tensors="pt").pixel_values
+
+    halaman = []
+    for file_path in files:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            items = [item for item in json.load(f) if item['word'].replace('Ġ', '')]
+        if items:
+            halaman.append(items)
+
+    true_labels, true_predictions = [], []
+    with torch.no_grad():
+        for awal in range(0, len(halaman), batch_size):
+            batch = halaman[awal:awal + batch_size]
+            encoding = processor.tokenizer(
+                [[item['word'].replace('Ġ', '') for item in items] for items in batch],
+                boxes=[[item['box'] for item in items] for items in batch],
+                # Label yang tidak dikenal model diabaikan (-100) agar tidak mengganggu metrik
+                word_labels=[[label2id.get(item['label'], -100) for item in items] for items in batch],
+                padding="max_length",
+                truncation=True,
+                max_length=512,
+                return_tensors="pt",
+            )
+            labels = encoding.pop("labels")
+            outputs = model(**encoding, pixel_values=placeholder.expand(len(batch), -1, -1, -1))
+            predictions = outputs.logits.argmax(-1)
+            for prediction, label in zip(predictions.tolist(), labels.tolist()):
+                true_predictions.append([model.config.id2label[p] for p, l in zip(prediction, label) if l != -100])
+                true_labels.append([model.config.id2label[l] for p, l in zip(prediction, label) if l != -100])
+
+    return {
+        "jumlah_halaman_anotasi": len(halaman),
+        "precision": precision_score(true_labels, true_predictions),
+        "recall": recall_score(true_labels, true_predictions),
+        "f1": f1_score(true_labels, true_predictions),
+    }
+
+def evaluasi_throughput(pages_dir: str, maks_halaman: int) -> dict:
+    """Mengukur latensi produksi lewat jalur yang sama dengan backend (analisis_halaman_dengan_layoutlmv3)."""
+    daftar_gambar = sorted(f for f in os.listdir(pages_dir) if f.lower().endswith(EKSTENSI_GAMBAR))[:maks_halaman]
+    latensi, jumlah_token = [], 0
+    for nama_file in daftar_gambar:
+        image = Image.open(os.path.join(pages_dir, nama_file)).convert("RGB")
+        mulai = time.perf_counter()
+        hasil = analisis_halaman_dengan_layoutlmv3(image)
+        latensi.append(time.perf_counter() - mulai)
+        jumlah_token += len(hasil["hasil_analisis_kontekstual"])
+
+    if not latensi:
+        return {"jumlah_halaman_render": 0}
+    return {
+        "jumlah_halaman_render": len(latensi),
+        "latensi_p50_detik": float(np.percentile(latensi, 50)),
+        "latensi_p95_detik": float(np.percentile(latensi, 95)),
+        "token_per_detik": jumlah_token / sum(latensi),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluasi checkpoint LayoutLMv3: F1 pada data held-out dan throughput pada halaman render.")
+    parser.add_argument("--checkpoint", required=True, help="Folder model/checkpoint yang dievaluasi.")
+    parser.add_argument("--processor", help="Folder processor jika checkpoint tidak menyimpannya (mis. models/layoutlmv3-finetuned-laporan).")
+    parser.add_argument("--annotations", default="data_preparation/03_training_data/*.json", help="Glob file anotasi held-out.")
+    parser.add_argument("--split_meta", help="meta.json dari training_output/dataset_cache/<hash>/ untuk memakai eval_files yang sama dengan training.")
+    parser.add_argument("--pages_dir", required=True, help="Direktori berisi halaman yang sudah dirender (png/jpg) untuk pengukuran latensi.")
+    parser.add_argument("--maks_halaman", type=int, default=100, help="Jumlah halaman render maksimum untuk pengukuran latensi.")
+    parser.add_argument("--batch_size", type=int, default=8, help="Ukuran batch evaluasi akurasi.")
+    parser.add_argument("--quantize", action="store_true", help="Evaluasi varian kuantisasi dinamis int8.")
+    parser.add_argument("--output", default="evaluasi_model.json", help="File JSON hasil evaluasi.")
+    args = parser.parse_args()
+
+    load_model(args.checkpoint, args.processor)
+    if args.quantize:
+        print("Menerapkan kuantisasi dinamis int8...")
+        kuantisasi_dinamis()
+
+    files = daftar_file_anotasi(args)
+    print(f"Mengevaluasi akurasi pada {len(files)} file anotasi...")
+    hasil_akurasi = evaluasi_akurasi(files, args.batch_size)
+
+    print(f"Mengukur throughput pada halaman di: {args.pages_dir}")
+    hasil_throughput = evaluasi_throughput(args.pages_dir, args.maks_halaman)
+
+    hasil = {
+        "checkpoint": args.checkpoint,
+        "quantize": args.quantize,
+        **hasil_akurasi,
+        **hasil_throughput,
+        # ru_maxrss dilaporkan dalam KB di Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(hasil, f, indent=4, ensure_ascii=False)
+
+    print(json.dumps(hasil, indent=4))
+    print(f"\nHasil evaluasi disimpan di: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,20 @@
 # train_model.py (Versi yang Disesuaikan dengan Struktur Folder Baru)
 import json
 import glob
+import hashlib
 import random
 import torch
 import os
 from PIL import Image
-from datasets import Dataset, Features, Sequence, ClassLabel, Value, Array2D, Array3D
+from datasets import Dataset, Features, Sequence, ClassLabel, Value, Array2D, load_from_disk
 import numpy as np
 from seqeval.metrics import f1_score, precision_score, recall_score 
 from transformers import (
     LayoutLMv3ForTokenClassification,
     LayoutLMv3Processor,
     TrainingArguments,
-    Trainer
+    Trainer,
+    default_data_collator
 )
 
 def compute_metrics(p):
@@ -37,6 +39,11 @@ PATH_TO_ANNOTATIONS = "data_preparation/03_training_data/*.json"
 BASE_MODEL_PATH = "models/layoutlmv3-base"
 NEW_MODEL_PATH = "models/layoutlmv3-finetuned-laporan"
 CHECKPOINTS_PATH = "training_output/checkpoints"
+# Dataset hasil pra-pemrosesan di-cache (Arrow, memory-mapped) per hash isi file anotasi
+DATASET_CACHE_PATH = "training_output/dataset_cache"
+# Seed tetap agar pembagian train/eval (dan kunci cache) sama di setiap run
+SPLIT_SEED = 42
+NUM_PROC = max(1, min(os.cpu_count() or 1, 8))
 
 # Pastikan folder output ada
 os.makedirs(NEW_MODEL_PATH, exist_ok=True)
@@ -45,11 +52,11 @@ os.makedirs(CHECKPOINTS_PATH, exist_ok=True)
 
 # --- 1. Memuat dan Mempersiapkan Dataset ---
 print(f"Mencari semua file anotasi di: {PATH_TO_ANNOTATIONS}")
-all_annotation_files = glob.glob(PATH_TO_ANNOTATIONS)
+all_annotation_files = sorted(glob.glob(PATH_TO_ANNOTATIONS))
 if not all_annotation_files:
     raise ValueError(f"Tidak ada file anotasi .json yang ditemukan! Periksa path: '{PATH_TO_ANNOTATIONS}'")
 
-random.shuffle(all_annotation_files)
+random.Random(SPLIT_SEED).shuffle(all_annotation_files)
 print(f"Ditemukan {len(all_annotation_files)} file anotasi.")
 
 # Bagi data menjadi set training dan evaluasi (misal, 80% train, 20% eval)
@@ -69,11 +76,32 @@ def load_dataset_from_files(files):
             data.append(json.load(f))
     return data
 
-train_data = load_dataset_from_files(train_files)
-eval_data = load_dataset_from_files(eval_files)
+def hash_annotation_files(train_files, eval_files):
+    # Kunci cache: isi file (bukan mtime) + pembagian split + model dasar yang menentukan tokenizer
+    hasher = hashlib.sha256(f"v1|{BASE_MODEL_PATH}|".encode())
+    for split_name, files in (("train", train_files), ("eval", eval_files)):
+        hasher.update(split_name.encode())
+        for file_path in files:
+            hasher.update(os.path.basename(file_path).encode())
+            with open(file_path, 'rb') as f:
+                hasher.update(hashlib.sha256(f.read()).digest())
+    return hasher.hexdigest()[:16]
+
+cache_dir = os.path.join(DATASET_CACHE_PATH, hash_annotation_files(train_files, eval_files))
+cache_meta_path = os.path.join(cache_dir, "meta.json")
+cache_hit = os.path.exists(cache_meta_path)
+
+if cache_hit:
+    print(f"Memakai dataset ter-cache di: {cache_dir}")
+    with open(cache_meta_path, 'r', encoding='utf-8') as f:
+        unique_labels = json.load(f)["unique_labels"]
+else:
+    train_data = load_dataset_from_files(train_files)
+    eval_data = load_dataset_from_files(eval_files)
+
+    # Ambil semua label unik dari data training
+    unique_labels = sorted(list(set(item['label'] for page in train_data for item in page)))
 
-# Ambil semua label unik dari data training
-unique_labels = sorted(list(set(item['label'] for page in train_data for item in page)))
 label2id = {label: i for i, label in enumerate(unique_labels)}
 id2label = {i: label for i, label in enumerate(unique_labels)}
 print(f"Label yang akan dilatih: {label2id}")
@@ -98,15 +126,14 @@ def create_dataset_dict(data):
             
     return {"words": words_list, "bboxes": boxes_list, "ner_tags": labels_list}
 
-train_dataset = Dataset.from_dict(create_dataset_dict(train_data))
-eval_dataset = Dataset.from_dict(create_dataset_dict(eval_data))
-
-
 # --- 2. Pra-pemrosesan Data untuk Model ---
 processor = LayoutLMv3Processor.from_pretrained(BASE_MODEL_PATH, apply_ocr=False)
 
+# Gambar placeholder karena kita fokus pada teks dan layout: cukup satu tensor konstan
+# yang dipakai bersama oleh semua contoh (ditambahkan di collator, tidak disimpan di dataset)
+PLACEHOLDER_PIXEL_VALUES = processor.image_processor(Image.new("RGB", (1000, 1000)), return_tensors="pt").pixel_values[0]
+
 features = Features({
-    'pixel_values': Array3D(dtype="float32", shape=(3, 224, 224)),
     'input_ids': Sequence(feature=Value(dtype='int64')),
     'attention_mask': Sequence(Value(dtype='int64')),
     'bbox': Array2D(dtype="int64", shape=(512, 4)),
@@ -114,11 +141,7 @@ features = Features({
 })
 
 def preprocess_data(examples):
-    # Buat gambar placeholder karena kita fokus pada teks dan layout
-    images = [Image.new("RGB", (1000, 1000)) for _ in range(len(examples['words']))] 
-    
-    encoded_inputs = processor(
-        images,
+    encoded_inputs = processor.tokenizer(
         examples['words'],
         boxes=examples['bboxes'],
         word_labels=examples['ner_tags'],
@@ -128,8 +151,29 @@ def preprocess_data(examples):
     )
     return encoded_inputs
 
-train_dataset = train_dataset.map(preprocess_data, batched=True, remove_columns=train_dataset.column_names, features=features)
-eval_dataset = eval_dataset.map(preprocess_data, batched=True, remove_columns=eval_dataset.column_names, features=features)
+def collate_with_placeholder_image(batch):
+    collated = default_data_collator(batch)
+    collated["pixel_values"] = PLACEHOLDER_PIXEL_VALUES.unsqueeze(0).expand(len(batch), -1, -1, -1)
+    return collated
+
+if cache_hit:
+    # Arrow di-memory-map dari disk, tanpa membaca ulang JSON maupun tokenisasi ulang
+    train_dataset = load_from_disk(os.path.join(cache_dir, "train"))
+    eval_dataset = load_from_disk(os.path.join(cache_dir, "eval"))
+else:
+    train_dataset = Dataset.from_dict(create_dataset_dict(train_data))
+    eval_dataset = Dataset.from_dict(create_dataset_dict(eval_data))
+
+    print(f"Cache belum ada, melakukan pra-pemrosesan dengan {NUM_PROC} proses...")
+    train_dataset = train_dataset.map(preprocess_data, batched=True, remove_columns=train_dataset.column_names, features=features, num_proc=min(NUM_PROC, max(1, len(train_dataset))))
+    eval_dataset = eval_dataset.map(preprocess_data, batched=True, remove_columns=eval_dataset.column_names, features=features, num_proc=min(NUM_PROC, max(1, len(eval_dataset))))
+
+    train_dataset.save_to_disk(os.path.join(cache_dir, "train"))
+    eval_dataset.save_to_disk(os.path.join(cache_dir, "eval"))
+    # meta.json ditulis terakhir sebagai penanda cache lengkap
+    with open(cache_meta_path, 'w', encoding='utf-8') as f:
+        json.dump({"unique_labels": unique_labels, "train_files": train_files, "eval_files": eval_files}, f, indent=4, ensure_ascii=False)
+    print(f"Dataset hasil pra-pemrosesan disimpan ke cache: {cache_dir}")
 
 
 # --- 3. Memuat Model dan Konfigurasi Training ---
@@ -161,6 +205,7 @@ trainer = Trainer(
     args=training_args,
     train_dataset=train_dataset,
     eval_dataset=eval_dataset,
+    data_collator=collate_with_placeholder_image,
     compute_metrics=compute_metrics
 )
 